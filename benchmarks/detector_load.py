@@ -0,0 +1,275 @@
+"""Load test of a DetectorNode with a synthetic detector.
+
+Starts a DetectorNode in a child process, drives REST `/detect`, SocketIO `detect` and SocketIO `batch_detect`
+with a number of concurrent clients and reports latency percentiles, throughput and the event loop lag of the node:
+
+    python -m benchmarks.detector_load [--transports rest sio sio_batch] [--concurrency 1 8 32]
+                                       [--image-sizes 640x480 1920x1080] [--autoupload disabled filtered]
+                                       [--inference-ms 20] [--distribution fixed|normal|exponential]
+                                       [--requests 200] [--batch-size 8]
+
+Node options (e.g. DETECTION_BATCH_SIZE, DETECTOR_REPLICAS or PROCESS_INFERENCE) are read from the environment as usual.
+The synthetic detector sleeps for the inference time (like a detector waiting for a GPU) and returns `--boxes` boxes;
+`batch_evaluate` takes as long as evaluating the images one by one.
+The node uses a temporary data folder and its outbox upload is stopped, so autouploads are only written to disk.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import socket
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+import socketio
+import uvicorn
+
+from learning_loop_node.data_classes import BoxDetection, ImageMetadata, ImagesMetadata, ModelInformation
+from learning_loop_node.detector.detector_node import DetectorNode
+from learning_loop_node.globals import GLOBALS
+from learning_loop_node.helpers.misc import numpy_array_to_jpg_bytes
+
+LAG_INTERVAL_S = 0.01
+
+
+@dataclass
+class Scenario:
+    transport: str
+    concurrency: int
+    width: int
+    height: int
+    autoupload: str
+
+
+@dataclass
+class Result:
+    latencies_s: List[float]
+    errors: int
+    duration_s: float
+    images: int
+    lags_s: List[float]
+
+
+class SyntheticDetectorLogic:
+
+    def __init__(self, inference_s: float, distribution: str, boxes: int) -> None:
+        self.inference_s = inference_s
+        self.distribution = distribution
+        self.boxes = boxes
+
+    def evaluate(self, image: np.ndarray) -> ImageMetadata:
+        time.sleep(self._inference_time())
+        height, width = image.shape[:2]
+        return ImageMetadata(box_detections=[
+            BoxDetection(category_name='synthetic', category_id='1', x=i % width, y=i % height, width=10, height=10,
+                         model_name='synthetic', confidence=0.5) for i in range(self.boxes)])
+
+    def batch_evaluate(self, images: List[np.ndarray]) -> ImagesMetadata:
+        return ImagesMetadata(items=[self.evaluate(image) for image in images])
+
+    def _inference_time(self) -> float:
+        if self.distribution == 'normal':
+            return max(0.0, random.gauss(self.inference_s, self.inference_s / 4))
+        if self.distribution == 'exponential':
+            return random.expovariate(1 / self.inference_s) if self.inference_s else 0.0
+        return self.inference_s
+
+
+class SyntheticDetectorFactory:
+    model_format = 'synthetic'
+
+    def __init__(self, inference_s: float, distribution: str, boxes: int) -> None:
+        self.inference_s = inference_s
+        self.distribution = distribution
+        self.boxes = boxes
+
+    async def build(self, model_info: ModelInformation) -> SyntheticDetectorLogic:
+        return SyntheticDetectorLogic(self.inference_s, self.distribution, self.boxes)
+
+
+def run_node(factory: SyntheticDetectorFactory, port: int, lags: 'multiprocessing.Queue[float]') -> None:
+    """Entry point of the node process: serve the node and report the lag of its event loop."""
+    logging.getLogger().setLevel(logging.ERROR)
+    node = DetectorNode(name='benchmark', detector_factory=factory)
+
+    async def measure_lag() -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL_S)
+            lags.put(time.perf_counter() - start - LAG_INTERVAL_S)
+
+    async def serve() -> None:
+        server = uvicorn.Server(uvicorn.Config(node, host='127.0.0.1', port=port, log_level='warning'))
+        lag_task = asyncio.create_task(measure_lag())
+        await server.serve()
+        lag_task.cancel()
+
+    asyncio.run(serve())
+
+
+def write_model(data_folder: str) -> None:
+    model_info = ModelInformation(id='benchmark', host='', organization='benchmark', project='benchmark',
+                                  version='1.0', resolution=640)
+    model_dir = os.path.join(data_folder, 'models', model_info.version)
+    os.makedirs(model_dir)
+    with open(os.path.join(model_dir, 'model.json'), 'w') as f:
+        json.dump(asdict(model_info), f)
+    os.symlink(model_dir, os.path.join(data_folder, 'current_model'))
+
+
+async def wait_for_node(base_url: str, timeout_s: float = 60) -> None:
+    """Wait until the node has loaded the model and stop its outbox upload."""
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get('/about')).json().get('model_info'):
+                    await client.put('/outbox_mode', content='stopped', timeout=30)
+                    return
+            except (httpx.HTTPError, ValueError):
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError('detector node did not start')
+
+
+async def run_scenario(scenario: Scenario, base_url: str, requests: int, batch_size: int,
+                       lags: 'multiprocessing.Queue[float]') -> Result:
+    image = np.random.default_rng(0).integers(0, 256, (scenario.height, scenario.width, 3), dtype=np.uint8)
+    jpg = numpy_array_to_jpg_bytes(image)
+    image_dict = {'bytes': image.tobytes(), 'shape': image.shape, 'dtype': str(image.dtype)}
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def client_loop(send) -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                ok = await send()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    async def rest_client() -> None:
+        headers = {'autoupload': scenario.autoupload, 'camera_id': f'cam{id(asyncio.current_task())}'}
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            async def send() -> bool:
+                response = await client.post('/detect', files={'file': ('image.jpg', jpg)}, headers=headers)
+                return response.status_code == 200
+            await client_loop(send)
+
+    async def sio_client() -> None:
+        sio = socketio.AsyncClient()
+        await sio.connect(base_url.replace('http', 'ws'), socketio_path='/ws/socket.io')
+        try:
+            async def send() -> bool:
+                if scenario.transport == 'sio_batch':
+                    data: Dict[str, Any] = {'images': [image_dict] * batch_size, 'autoupload': scenario.autoupload}
+                    result = await sio.call('batch_detect', data, timeout=120)
+                else:
+                    result = await sio.call('detect', {'image': image_dict, 'autoupload': scenario.autoupload},
+                                            timeout=120)
+                return 'error' not in result
+            await client_loop(send)
+        finally:
+            await sio.disconnect()
+
+    client = rest_client if scenario.transport == 'rest' else sio_client
+    _drain(lags)
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(scenario.concurrency)])
+    duration = time.perf_counter() - start
+    images = len(latencies) * (batch_size if scenario.transport == 'sio_batch' else 1)
+    return Result(latencies_s=latencies, errors=errors, duration_s=duration, images=images, lags_s=_drain(lags))
+
+
+def _drain(lags: 'multiprocessing.Queue[float]') -> List[float]:
+    values = []
+    while True:
+        try:
+            values.append(lags.get_nowait())
+        except queue.Empty:
+            return values
+
+
+def _percentiles_ms(values: List[float]) -> Tuple[float, float, float]:
+    if not values:
+        return (float('nan'),) * 3  # type: ignore
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return p50, p95, p99
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _size(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+async def benchmark(args: argparse.Namespace, base_url: str, lags: 'multiprocessing.Queue[float]') -> None:
+    await wait_for_node(base_url)
+    print(f'{"transport":<10}{"clients":>8}{"image":>11}{"upload":>10}{"req/s":>9}{"img/s":>9}{"errors":>8}'
+          f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"lag p99 ms":>12}{"lag max ms":>12}')
+    for transport in args.transports:
+        for concurrency in args.concurrency:
+            for width, height in args.image_sizes:
+                for autoupload in args.autoupload:
+                    scenario = Scenario(transport, concurrency, width, height, autoupload)
+                    result = await run_scenario(scenario, base_url, args.requests, args.batch_size, lags)
+                    p50, p95, p99 = _percentiles_ms(result.latencies_s)
+                    lag_p99 = _percentiles_ms(result.lags_s)[2]
+                    lag_max = max(result.lags_s, default=0) * 1000
+                    print(f'{transport:<10}{concurrency:>8}{f"{width}x{height}":>11}{autoupload:>10}'
+                          f'{len(result.latencies_s) / result.duration_s:>9.1f}{result.images / result.duration_s:>9.1f}'
+                          f'{result.errors:>8}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{lag_p99:>12.1f}{lag_max:>12.1f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transports', nargs='+', choices=['rest', 'sio', 'sio_batch'], default=['rest', 'sio'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--image-sizes', nargs='+', type=_size, default=[(640, 480)], help='WIDTHxHEIGHT')
+    parser.add_argument('--autoupload', nargs='+', choices=['disabled', 'filtered', 'all'], default=['disabled'])
+    parser.add_argument('--inference-ms', type=float, default=20, help='(mean) inference time per image')
+    parser.add_argument('--distribution', choices=['fixed', 'normal', 'exponential'], default='fixed')
+    parser.add_argument('--boxes', type=int, default=10, help='number of box detections per image')
+    parser.add_argument('--requests', type=int, default=200, help='number of requests per scenario')
+    parser.add_argument('--batch-size', type=int, default=8, help='images per sio_batch request')
+    parser.add_argument('--port', type=int, default=None, help='port of the node (default: a free port)')
+    args = parser.parse_args()
+
+    port = args.port or _free_port()
+    os.environ.setdefault('LOOP_ORGANIZATION', 'benchmark')
+    os.environ.setdefault('LOOP_PROJECT', 'benchmark')
+    with tempfile.TemporaryDirectory() as data_folder:
+        GLOBALS.data_folder = data_folder
+        write_model(data_folder)
+        factory = SyntheticDetectorFactory(args.inference_ms / 1000, args.distribution, args.boxes)
+        context = multiprocessing.get_context('fork')
+        lags: 'multiprocessing.Queue[float]' = context.Queue()
+        process = context.Process(target=run_node, args=(factory, port, lags), daemon=True)
+        process.start()
+        try:
+            asyncio.run(benchmark(args, f'http://127.0.0.1:{port}', lags))
+        finally:
+            process.terminate()
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Micro-benchmark of the generated data class serializers against asdict + jsonable_encoder and dacite.
+
+    python -m benchmarks.serialization [--boxes 100] [--repetitions 200]
+"""
+import argparse
+import timeit
+from dataclasses import asdict
+
+from dacite import from_dict
+from fastapi.encoders import jsonable_encoder
+
+from learning_loop_node.data_classes import (
+    BoxDetection,
+    Detections,
+    ImageMetadata,
+    Point,
+    SegmentationDetection,
+    Shape,
+    as_jsonable,
+    from_jsonable,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boxes', type=int, default=100, help='number of box detections per image')
+    parser.add_argument('--repetitions', type=int, default=200)
+    args = parser.parse_args()
+
+    boxes = [BoxDetection(category_name='dirt', category_id='1', x=i, y=i, width=10, height=10,
+                          model_name='1.0', confidence=0.5) for i in range(args.boxes)]
+    segmentations = [SegmentationDetection(category_name='leaf', category_id='2', model_name='1.0', confidence=0.5,
+                                           shape=Shape(points=[Point(x=i, y=i) for i in range(50)]))]
+    metadata = ImageMetadata(box_detections=boxes, segmentation_detections=segmentations, tags=['bench'])
+    detections = Detections(box_detections=boxes, image_id='image')
+    data = as_jsonable(metadata)
+
+    cases = {
+        'encode ImageMetadata': (lambda: jsonable_encoder(asdict(metadata)), lambda: as_jsonable(metadata)),
+        'encode Detections': (lambda: jsonable_encoder(asdict(detections)), lambda: as_jsonable(detections)),
+        'decode ImageMetadata': (lambda: from_dict(data_class=ImageMetadata, data=data),
+                                 lambda: from_jsonable(ImageMetadata, data)),
+    }
+    print(f'{"case":<24}{"generic [µs]":>14}{"generated [µs]":>16}{"speedup":>10}')
+    for name, (generic, generated) in cases.items():
+        generic_us = min(timeit.repeat(generic, number=args.repetitions, repeat=3)) / args.repetitions * 1e6
+        generated_us = min(timeit.repeat(generated, number=args.repetitions, repeat=3)) / args.repetitions * 1e6
+        print(f'{name:<24}{generic_us:>14.1f}{generated_us:>16.1f}{generic_us / generated_us:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
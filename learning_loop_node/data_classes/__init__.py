@@ -27,6 +27,7 @@ from .general import (
     NodeStatus,
 )
 from .image_metadata import ImageMetadata, ImagesMetadata
+from .serialization import as_jsonable, from_jsonable, precompile
 from .socket_response import SocketResponse
 from .training import (
     Errors,
@@ -47,4 +48,7 @@ __all__ = [
     'SocketResponse',
     'Errors', 'PretrainedModel', 'Training',
     'TrainingError', 'TrainingOut', 'TrainingStateData', 'TrainingStatus',
+    'as_jsonable', 'from_jsonable',
 ]
+
+precompile(ImageMetadata, ImagesMetadata, Detections, DetectorStatus, Training, TrainingStatus)
@@ -111,6 +111,16 @@ class AboutResponse:
     version_control: str = field(metadata={
         "description": "The version control mode of the detector node",
         "example": "follow_loop, specific_version, pause"})
+    inference_queue_depth: int = field(default=0, metadata={
+        "description": "The number of detection requests waiting for inference"})
+    detection_cache_hits: int = field(default=0, metadata={
+        "description": "The number of detections answered from the result cache"})
+    detection_cache_misses: int = field(default=0, metadata={
+        "description": "The number of detections which were not found in the result cache"})
+    model_warmup_s: Optional[float] = field(default=None, metadata={
+        "description": "How long the warm-up of the current model took in seconds (if MODEL_WARMUP_RUNS is set)"})
+    standby_model: Optional[str] = field(default=None, metadata={
+        "description": "The version of the previous model which is kept loaded for an instant rollback"})
 
 
 @dataclass(**KWONLY_SLOTS)
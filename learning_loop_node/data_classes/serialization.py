@@ -0,0 +1,183 @@
+"""Fast (de)serialization of the data classes.
+
+`asdict` + `jsonable_encoder` and `dacite.from_dict` inspect every field and type on every call.
+Here an encoder and a decoder function is generated once per data class from its type hints
+and reused afterwards:
+
+- `as_jsonable(obj)` returns the same structure as `jsonable_encoder(asdict(obj))`
+- `from_jsonable(cls, data)` builds the data class like `dacite.from_dict(cls, data)`;
+  ints are accepted for float fields and values of unknown types (Any, Dict, enums) are taken as is.
+"""
+import dataclasses
+import typing
+from enum import Enum
+from typing import Any, Callable, Dict, List, Set, Tuple, Type, TypeVar, Union
+
+from fastapi.encoders import jsonable_encoder
+
+T = TypeVar('T')
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+_encoders: Dict[type, Callable[[Any], Dict[str, Any]]] = {}
+_decoders: Dict[type, Callable[[Dict[str, Any]], Any]] = {}
+_compiling: Set[Tuple[str, type]] = set()
+"""(kind, data class) pairs whose encoder or decoder is being generated (for recursive data classes)"""
+
+
+def as_jsonable(obj: Any) -> Any:
+    """Convert a data class instance (or a list of them) into JSON compatible dicts and lists."""
+    if isinstance(obj, list):
+        return [as_jsonable(item) for item in obj]
+    cls = type(obj)
+    if not dataclasses.is_dataclass(cls):
+        return jsonable_encoder(obj)
+    return _encoder(cls)(obj)
+
+
+def from_jsonable(cls: Type[T], data: Dict[str, Any]) -> T:
+    """Build an instance of the data class from a JSON compatible dict.
+
+    :raises TypeError: if a field is missing or has a wrong type
+    """
+    return _decoder(cls)(data)
+
+
+def precompile(*classes: type) -> None:
+    """Generate the encoders and decoders of the given data classes (and their nested data classes) ahead of time."""
+    for cls in classes:
+        _encoder(cls)
+        _decoder(cls)
+
+
+def _encoder(cls: type) -> Callable[[Any], Dict[str, Any]]:
+    encoder = _encoders.get(cls)
+    if encoder is None:
+        _compiling.add(('encode', cls))
+        try:
+            namespace: Dict[str, Any] = {}
+            items = [f'{name!r}: {_encode_expr(tp, f"o.{name}", namespace, 0)}' for name, tp in _fields(cls)]
+            encoder = _compile(f'def encode(o):\n    return {{{", ".join(items)}}}', 'encode', namespace)
+        finally:
+            _compiling.discard(('encode', cls))
+        _encoders[cls] = encoder
+    return encoder
+
+
+def _decoder(cls: type) -> Callable[[Dict[str, Any]], Any]:
+    decoder = _decoders.get(cls)
+    if decoder is None:
+        _compiling.add(('decode', cls))
+        try:
+            namespace: Dict[str, Any] = {'cls': cls, 'MISSING': dataclasses.MISSING, 'wrong_type': _wrong_type}
+            lines = ['def decode(d):',
+                     '    if not isinstance(d, dict):',
+                     f'        wrong_type(d, "dict", {cls.__name__!r})',
+                     '    kwargs = {}']
+            for name, tp in _fields(cls, init_only=True):
+                expr = _decode_expr(tp, 'v', namespace, 0, f'{cls.__name__}.{name}')
+                lines.append(f'    v = d.get({name!r}, MISSING)')
+                lines.append('    if v is not MISSING:')
+                lines.append(f'        kwargs[{name!r}] = {expr}')
+            lines.append('    return cls(**kwargs)')
+            decoder = _compile('\n'.join(lines), 'decode', namespace)
+        finally:
+            _compiling.discard(('decode', cls))
+        _decoders[cls] = decoder
+    return decoder
+
+
+def _encoder_ref(cls: type, namespace: Dict[str, Any]) -> str:
+    """Return an expression for the encoder of the data class in the generated code."""
+    if ('encode', cls) in _compiling:  # recursive data class: look the encoder up when it is called
+        return f'{_bind(namespace, _encoders)}[{_bind(namespace, cls)}]'
+    return _bind(namespace, _encoder(cls))
+
+
+def _decoder_ref(cls: type, namespace: Dict[str, Any]) -> str:
+    """Return an expression for the decoder of the data class in the generated code."""
+    if ('decode', cls) in _compiling:  # recursive data class: look the decoder up when it is called
+        return f'{_bind(namespace, _decoders)}[{_bind(namespace, cls)}]'
+    return _bind(namespace, _decoder(cls))
+
+
+def _fields(cls: type, *, init_only: bool = False) -> List[Tuple[str, Any]]:
+    hints = typing.get_type_hints(cls)
+    return [(f.name, hints[f.name]) for f in dataclasses.fields(cls) if f.init or not init_only]
+
+
+def _compile(source: str, name: str, namespace: Dict[str, Any]) -> Callable:
+    exec(source, namespace)  # pylint: disable=exec-used
+    return namespace[name]
+
+
+def _bind(namespace: Dict[str, Any], value: Any) -> str:
+    """Make the value available in the generated code and return its name."""
+    name = f'_{len(namespace)}'
+    namespace[name] = value
+    return name
+
+
+def _encode_expr(tp: Any, var: str, namespace: Dict[str, Any], depth: int) -> str:
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if tp in _PRIMITIVES:
+        primitives, jsonable = _bind(namespace, _PRIMITIVES), _bind(namespace, jsonable_encoder)
+        return f'({var} if {var}.__class__ in {primitives} else {jsonable}({var}))'
+    if dataclasses.is_dataclass(tp):
+        return f'{_encoder_ref(tp, namespace)}({var})'
+    if origin in (list, List) and args:
+        item = f'i{depth}'
+        return f'[{_encode_expr(args[0], item, namespace, depth + 1)} for {item} in {var}]'
+    if origin is Union:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return f'(None if {var} is None else {_encode_expr(members[0], var, namespace, depth)})'
+        expr = f'{_bind(namespace, jsonable_encoder)}({var})'
+        for member in reversed(members):
+            if dataclasses.is_dataclass(member):
+                encode = _encoder_ref(member, namespace)
+                expr = f'({encode}({var}) if isinstance({var}, {_bind(namespace, member)}) else {expr})'
+        return expr
+    return f'{_bind(namespace, jsonable_encoder)}({var})'  # Any, Dict, enums, ...
+
+
+def _decode_expr(tp: Any, var: str, namespace: Dict[str, Any], depth: int, field: str) -> str:
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if tp is float:
+        return f'({var} if isinstance({var}, float) else {_bind(namespace, _to_float)}({var}, {field!r}))'
+    if tp in (str, int, bool):
+        return f'({var} if isinstance({var}, {tp.__name__}) else wrong_type({var}, {tp.__name__!r}, {field!r}))'
+    if dataclasses.is_dataclass(tp):
+        return f'{_decoder_ref(tp, namespace)}({var})'
+    if origin in (list, List) and args:
+        item = f'i{depth}'
+        return (f'([{_decode_expr(args[0], item, namespace, depth + 1, field)} for {item} in {var}] '
+                f'if isinstance({var}, list) else wrong_type({var}, "list", {field!r}))')
+    if origin is Union:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return f'(None if {var} is None else {_decode_expr(members[0], var, namespace, depth, field)})'
+        others = [member for member in members if not dataclasses.is_dataclass(member)]
+        if all(isinstance(member, type) for member in others):  # e.g. str or enums, but not Any or Dict[...]
+            allowed = tuple(others) + ((int,) if float in others else ()) + tuple(a for a in args if a not in members)
+            names = ', '.join(arg.__name__ for arg in args)
+            expr = (f'({var} if isinstance({var}, {_bind(namespace, allowed)}) '
+                    f'else wrong_type({var}, {f"Union[{names}]"!r}, {field!r}))')
+        else:
+            expr = var
+        for member in reversed(members):
+            if dataclasses.is_dataclass(member):
+                expr = f'({_decoder_ref(member, namespace)}({var}) if isinstance({var}, dict) else {expr})'
+        return expr
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return f'{_bind(namespace, tp)}({var})'
+    return var  # Any, Dict, ...
+
+
+def _to_float(value: Any, field: str) -> float:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return _wrong_type(value, 'float', field)
+
+
+def _wrong_type(value: Any, expected: str, field: str) -> Any:
+    raise TypeError(f'wrong value type for field "{field}" - should be "{expected}" instead of "{type(value).__name__}"')
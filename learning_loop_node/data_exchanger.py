@@ -5,17 +5,23 @@ import shutil
 import zipfile
 from glob import glob
 from http import HTTPStatus
-from io import BytesIO
 from time import time
 from typing import Any, Dict, List, Optional
 
 import aiofiles  # type: ignore
+import httpx
 
 from .data_classes import Context
+from .globals import GLOBALS
+from .helpers import run
 from .helpers.misc import create_resource_paths, create_task, is_valid_image
 from .loop_communication import LoopCommunicator
 from .trainer.exceptions import CriticalError
 
+MODEL_DOWNLOAD_ATTEMPTS = 5
+PARTIAL_DOWNLOAD_MAX_AGE_S = 24 * 60 * 60
+"""partial downloads of other models which were not resumed for this long are deleted"""
+
 
 class DownloadError(Exception):
 
@@ -139,38 +145,72 @@ class DataExchanger():
     async def download_model(self, target_folder: str, context: Context, model_uuid: str, model_format: str) -> List[str]:
         """Downloads a model (and additional meta data like model.json) and returns the paths of the downloaded files.
         Used before training a model (when continuing a finished training) or before detecting images.
+
+        The archive is streamed to a partial file in `GLOBALS.data_folder/downloads` without holding it in memory.
+        Interrupted downloads are resumed with HTTP Range requests (also by the next call for the same model
+        if the download was cancelled). The partial file is deleted if the download fails, and partial files of
+        other models are deleted once they were not resumed for PARTIAL_DOWNLOAD_MAX_AGE_S.
+        The complete archive is verified (size and CRC of every file) and extracted directly into the target folder.
         """
         logging.info('Downloading model data for uuid %s from the loop to %s..', model_uuid, target_folder)
 
         path = f'/{context.organization}/projects/{context.project}/models/{model_uuid}/{model_format}/file'
-        response = await self.loop_communicator.get(path, requires_login=False, timeout=60*10)
-        if response.status_code != 200:
-            decoded_content = response.content.decode('utf-8')
-            logging.error('could not download loop/%s: %s, content: %s', path,
-                          response.status_code, decoded_content)
-            raise DownloadError(decoded_content)
+        archive = os.path.join(GLOBALS.data_folder, 'downloads', f'{model_uuid}_{model_format}.zip.partial')
+        os.makedirs(os.path.dirname(archive), exist_ok=True)
+        _remove_stale_partial_downloads(os.path.dirname(archive), keep=archive)
         try:
-            provided_filename = response.headers.get(
-                "Content-Disposition").split("filename=")[1].strip('"')
-            content = response.content
-        except:
-            logging.exception('Error while downloading model %s:', path)
+            for attempt in range(1, MODEL_DOWNLOAD_ATTEMPTS + 1):
+                try:
+                    if await self._download_to_file(path, archive):
+                        break
+                    logging.warning('Download of %s ended early (attempt %d), resuming', path, attempt)
+                except httpx.TransportError as e:
+                    logging.warning('Download of %s interrupted (attempt %d): %s', path, attempt, e)
+                if attempt == MODEL_DOWNLOAD_ATTEMPTS:
+                    raise DownloadError(f'download of model {model_uuid} was interrupted {attempt} times')
+                await asyncio.sleep(1)
+        except DownloadError:
+            if os.path.exists(archive):
+                os.remove(archive)  # nothing may resume it, so it would fill the disk
             raise
 
-        tmp_path = f'/tmp/{os.path.splitext(provided_filename)[0]}'
-        shutil.rmtree(tmp_path, ignore_errors=True)
-        with zipfile.ZipFile(BytesIO(content), 'r') as zip_:
-            zip_.extractall(tmp_path)
-
-        created_files = []
-        for file in glob(f'{tmp_path}/**/*', recursive=True):
-            new_file = shutil.move(file, target_folder)
-            created_files.append(new_file)
-
-        shutil.rmtree(tmp_path, ignore_errors=True)
+        try:
+            created_files = await run.io_bound(_extract_archive, archive, target_folder)
+        except zipfile.BadZipFile as e:
+            logging.error('Downloaded model archive %s is corrupt: %s', path, e)
+            raise DownloadError(f'corrupt model archive: {e}') from e
+        finally:
+            os.remove(archive)  # a corrupt archive must not be resumed
         logging.info('Downloaded model %s(%s) to %s.', model_uuid, model_format, target_folder)
         return created_files
 
+    async def _download_to_file(self, path: str, file_path: str) -> bool:
+        """Append the remaining bytes of the resource to the (partial) file.
+
+        :return: whether the file is complete (False if the server closed the connection early)
+        :raise DownloadError: if the loop responds with an error
+        """
+        offset = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+        async with self.loop_communicator.stream(path, requires_login=False, timeout=60*10,
+                                                 headers=headers) as response:
+            if response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE and offset:
+                os.remove(file_path)  # the partial file does not belong to the current archive
+                return False
+            if response.status_code not in (HTTPStatus.OK, HTTPStatus.PARTIAL_CONTENT):
+                decoded_content = (await response.aread()).decode('utf-8', errors='replace')
+                logging.error('could not download loop/%s: %s, content: %s', path,
+                              response.status_code, decoded_content)
+                raise DownloadError(decoded_content)
+            if response.status_code == HTTPStatus.OK:
+                offset = 0  # the server does not support ranges; start over
+            content_length = response.headers.get('Content-Length')
+            expected_size = offset + int(content_length) if content_length is not None else None
+            async with aiofiles.open(file_path, 'ab' if offset else 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    await f.write(chunk)
+        return expected_size is None or os.path.getsize(file_path) >= expected_size
+
     async def upload_model_get_uuid(self, context: Context, files: List[str], training_number: Optional[int], mformat: str) -> str:
         """Used by the trainers. Function returns the new model uuid to use for detection.
 
@@ -188,3 +228,30 @@ class DataExchanger():
         logging.info('Uploaded model for training %s, format %s. Response is: %s',
                      training_number, mformat, uploaded_model)
         return uploaded_model['id']
+
+
+def _extract_archive(archive: str, target_folder: str) -> List[str]:
+    """Verify the CRCs of the zip archive and extract it into the target folder.
+
+    :return: the paths of the extracted top-level files and folders
+    :raise zipfile.BadZipFile: if the archive is corrupt
+    """
+    with zipfile.ZipFile(archive, 'r') as zip_:
+        corrupt_file = zip_.testzip()
+        if corrupt_file is not None:
+            raise zipfile.BadZipFile(f'bad CRC for {corrupt_file}')
+        os.makedirs(target_folder, exist_ok=True)
+        zip_.extractall(target_folder)
+        top_level = {name.split('/')[0] for name in zip_.namelist()}
+    return [os.path.join(target_folder, name) for name in sorted(top_level)]
+
+
+def _remove_stale_partial_downloads(folder: str, keep: str) -> None:
+    """Delete partial downloads (except `keep`) which were not written to for PARTIAL_DOWNLOAD_MAX_AGE_S."""
+    for partial in glob(os.path.join(folder, '*.partial')):
+        try:
+            if partial != keep and time() - os.path.getmtime(partial) > PARTIAL_DOWNLOAD_MAX_AGE_S:
+                os.remove(partial)
+                logging.info('Removed stale partial download %s', partial)
+        except OSError:
+            pass  # removed concurrently
@@ -1,6 +1,11 @@
-from .detector_logic import DetectorLogic, DetectorLogicFactory
+from .compiled_artifacts import CompiledArtifactCache
+from .detector_logic import CompilingDetectorLogicFactory, DetectorLogic, DetectorLogicFactory
+from .process_detector import ProcessDetectorLogicFactory
 
 __all__ = [
+    'CompiledArtifactCache',
+    'CompilingDetectorLogicFactory',
     'DetectorLogic',
     'DetectorLogicFactory',
+    'ProcessDetectorLogicFactory',
 ]
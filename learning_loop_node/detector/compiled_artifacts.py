@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import time
+from typing import Callable, Optional
+
+from ..data_classes import ModelInformation
+from ..globals import GLOBALS
+
+
+class CompiledArtifactCache:
+    """Persistent cache for artifacts which a DetectorLogicFactory compiles for the target hardware
+    (e.g. a TensorRT engine built from `.wts` weights).
+
+    Artifacts are stored in `GLOBALS.data_folder/compiled/<model id>/<model format>/<fingerprint>/`.
+    The fingerprint combines the CPU architecture and OS with the `fingerprint` given by the factory,
+    which should contain everything the artifact depends on (e.g. GPU name, CUDA and TensorRT versions).
+    After a restart with an unchanged model and environment the artifact is loaded instead of compiled again.
+    The artifacts of a model are removed together with the model (see ModelStore).
+    """
+
+    def __init__(self, model_info: ModelInformation, model_format: str, fingerprint: str = '') -> None:
+        self.log = logging.getLogger('CompiledArtifactCache')
+        self.fingerprint = hardware_fingerprint(fingerprint)
+        self.folder = os.path.join(self.model_folder(model_info.id), model_format, self.fingerprint)
+
+    @staticmethod
+    def model_folder(model_id: str) -> str:
+        return os.path.join(GLOBALS.data_folder, 'compiled', model_id)
+
+    @staticmethod
+    def remove_model(model_id: str) -> None:
+        """Delete all compiled artifacts of the model."""
+        shutil.rmtree(CompiledArtifactCache.model_folder(model_id), ignore_errors=True)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the path of the cached artifact or None if it was not compiled yet."""
+        path = os.path.join(self.folder, name)
+        return path if os.path.exists(path) else None
+
+    def get_or_compile(self, name: str, compile_artifact: Callable[[str], None]) -> str:
+        """Return the path of the cached artifact.
+
+        On a cache miss `compile_artifact(path)` is called to write the artifact (a file or a folder) to `path`.
+        It is written to a temporary path first, so an interrupted compilation does not leave a broken artifact.
+        """
+        path = self.lookup(name)
+        if path is not None:
+            self.log.info('Using compiled artifact %s', path)
+            return path
+        path = os.path.join(self.folder, name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(self.folder, exist_ok=True)
+        _remove(tmp_path)
+        start = time.perf_counter()
+        try:
+            compile_artifact(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            _remove(tmp_path)
+        self.log.info('Compiled artifact %s in %.1f s', path, time.perf_counter() - start)
+        return path
+
+
+def hardware_fingerprint(extra: str = '') -> str:
+    """Return a short hash of the CPU architecture, the OS and the given extra information."""
+    components = {'machine': platform.machine(), 'system': platform.system(), 'extra': extra}
+    return hashlib.sha256(json.dumps(components, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
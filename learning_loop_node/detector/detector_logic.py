@@ -1,8 +1,9 @@
-from typing import List, Protocol
+from typing import List, Protocol, Union, runtime_checkable
 
 import numpy as np
 
 from ..data_classes import ImageMetadata, ImagesMetadata, ModelInformation
+from .compiled_artifacts import CompiledArtifactCache
 
 
 class DetectorLogicFactory(Protocol):
@@ -10,6 +11,7 @@ class DetectorLogicFactory(Protocol):
 
     The factory controls how the detector is constructed — implementations
     can build synchronously or offload heavy work to a thread pool.
+    Factories which compile the model for the target hardware should implement CompilingDetectorLogicFactory.
     """
     @property
     def model_format(self) -> str: ...
@@ -17,6 +19,33 @@ class DetectorLogicFactory(Protocol):
     async def build(self, model_info: ModelInformation) -> 'DetectorLogic': ...
 
 
+@runtime_checkable
+class CompilingDetectorLogicFactory(Protocol):
+    """Protocol for factories which compile the model for the target hardware (e.g. `.wts` -> TensorRT engine).
+
+    The node passes a CompiledArtifactCache for the model to `build`, so the compiled artifact is kept across restarts.
+    The `artifact_fingerprint` should contain everything the artifact depends on (e.g. GPU name, CUDA version).
+    """
+    @property
+    def model_format(self) -> str: ...
+
+    @property
+    def artifact_fingerprint(self) -> str: ...
+
+    async def build(self, model_info: ModelInformation, artifact_cache: CompiledArtifactCache) -> 'DetectorLogic': ...
+
+
+AnyDetectorLogicFactory = Union[DetectorLogicFactory, CompilingDetectorLogicFactory]
+
+
+async def build_detector_logic(factory: AnyDetectorLogicFactory, model_info: ModelInformation) -> 'DetectorLogic':
+    """Build a DetectorLogic; compiling factories get the CompiledArtifactCache of the model."""
+    if isinstance(factory, CompilingDetectorLogicFactory):
+        cache = CompiledArtifactCache(model_info, factory.model_format, factory.artifact_fingerprint)
+        return await factory.build(model_info, cache)
+    return await factory.build(model_info)
+
+
 class DetectorLogic(Protocol):
     """Protocol for detector implementations.
 
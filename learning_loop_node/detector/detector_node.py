@@ -6,14 +6,13 @@ import os
 import shutil
 import subprocess
 import sys
-from dataclasses import asdict, dataclass
+import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Dict, List, Literal, Optional, Union
+from typing import Dict, List, Literal, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import socketio
-from dacite import from_dict
-from fastapi.encoders import jsonable_encoder
 from socketio import AsyncClient
 
 from ..data_classes import (
@@ -26,17 +25,30 @@ from ..data_classes import (
     ModelInformation,
     ModelVersionResponse,
     Shape,
+    as_jsonable,
+    from_jsonable,
 )
 from ..data_exchanger import DataExchanger, DownloadError
-from ..enums import OperationMode, VersionMode
+from ..enums import DetectionPriority, OperationMode, VersionMode
 from ..globals import GLOBALS
 from ..helpers import background_tasks, environment_reader, run
-from ..helpers.misc import numpy_image_from_dict
+from ..helpers.misc import decode_image_bytes, numpy_image_from_dict
 from ..node import Node
-from .detector_logic import DetectorLogic, DetectorLogicFactory
-from .exceptions import NodeNeedsRestartError
+from .detector_logic import AnyDetectorLogicFactory, DetectorLogic, build_detector_logic
+from .exceptions import (
+    DetectorOverloadedError,
+    FrameSupersededError,
+    NodeNeedsRestartError,
+    UnsupportedResponseFormatError,
+)
 from .inbox_filter.relevance_filter import RelevanceFilter
+from .inference_scheduler import InferenceScheduler
+from .model_store import ModelStore
+from .motion_gate import MotionGate
 from .outbox import Outbox
+from .pipeline import PipelineStage
+from .process_detector import ProcessDetectorLogicFactory
+from .response_encoding import check_response_format, encode_detections
 from .rest import about as rest_about
 from .rest import backdoor_controls
 from .rest import detect as rest_detect
@@ -44,16 +56,27 @@ from .rest import model_version_control as rest_version_control
 from .rest import operation_mode as rest_mode
 from .rest import outbox_mode as rest_outbox_mode
 from .rest import upload as rest_upload
+from .result_cache import ResultCache
 
 
 class DetectorNode(Node):
 
-    def __init__(self, name: str, detector_factory: DetectorLogicFactory,
+    def __init__(self, name: str, detector_factory: AnyDetectorLogicFactory,
                  uuid: Optional[str] = None, use_backdoor_controls: bool = False) -> None:
         super().__init__(name, uuid=uuid, node_type='detector', needs_login=False, needs_sio=False)
-        self._detector_factory = detector_factory
+        if os.environ.get('PROCESS_INFERENCE', '0').lower() in ('1', 'true'):
+            detector_factory = ProcessDetectorLogicFactory(
+                detector_factory, timeout_s=float(os.environ.get('PROCESS_INFERENCE_TIMEOUT_S', '60')))
+        self._detector_factory: AnyDetectorLogicFactory = detector_factory
         self._detector: _DetectorState = _Initializing()
         self._exclusive_model_build: bool = os.environ.get('EXCLUSIVE_MODEL_BUILD', '0').lower() in ('1', 'true')
+        self._num_replicas: int = max(1, int(os.environ.get('DETECTOR_REPLICAS', '1')))
+        """number of DetectorLogic instances built per model (pool mode if > 1)"""
+        self._warmup_runs: int = max(0, int(os.environ.get('MODEL_WARMUP_RUNS', '0')))
+        """number of synthetic evaluations per replica before a new model is swapped in"""
+        self._standby_max_bytes: int = max(0, int(os.environ.get('STANDBY_DETECTOR_MAX_MB', '0'))) * 1024 * 1024
+        """memory budget for keeping the previous detector loaded for an instant rollback (0 = disabled)"""
+        self._standby: Optional[_ActiveDetector] = None
         self._remaining_init_attempts: int = 2
         self.organization = environment_reader.organization()
         self.project = environment_reader.project()
@@ -62,9 +85,27 @@ class DetectorNode(Node):
         self.operation_mode: OperationMode = OperationMode.Startup
         self.connected_clients: List[str] = []
 
-        self.detection_lock = asyncio.Lock()
-
-        self.outbox: Outbox = Outbox()
+        self.detection_locks = [asyncio.Lock() for _ in range(self._num_replicas)]
+        """one lock per detector replica; a replica only evaluates one request at a time"""
+        self.inference_scheduler: InferenceScheduler[Tuple[ImageMetadata, str]] = InferenceScheduler(
+            self._evaluate_images,
+            num_slots=self._num_replicas,
+            max_batch_size=int(os.environ.get('DETECTION_BATCH_SIZE', '1')),
+            batch_window_s=float(os.environ.get('DETECTION_BATCH_WINDOW_MS', '5')) / 1000,
+            max_queue_depth=int(os.environ.get('INFERENCE_QUEUE_MAX_DEPTH', '0')),
+            max_wait_s=float(os.environ.get('INFERENCE_QUEUE_MAX_WAIT_S', '0')))
+        self.result_cache = ResultCache(int(os.environ.get('DETECTION_CACHE_SIZE', '0')))
+        self.motion_gate = MotionGate(float(os.environ.get('MOTION_GATE_THRESHOLD', '0')))
+        self._decode_to_model_resolution = os.environ.get('DECODE_TO_MODEL_RESOLUTION', '0').lower() in ('1', 'true')
+        pipeline_queue_size = int(os.environ.get('PIPELINE_QUEUE_SIZE', '32'))
+        self.decode_stage = PipelineStage('decode', workers=int(os.environ.get('DECODE_WORKERS', '2')),
+                                          queue_size=pipeline_queue_size)
+        """hashes and decodes images (and computes motion thumbnails) before they are scheduled for inference"""
+        self.postprocess_stage = PipelineStage('postprocess', workers=int(os.environ.get('POSTPROCESS_WORKERS', '1')),
+                                               queue_size=pipeline_queue_size)
+        """scales and converts the detections and encodes the responses"""
+
+        self.outbox: Outbox = Outbox(encoder_workers=int(os.environ.get('OUTBOX_ENCODER_WORKERS', '2')))
         self.data_exchanger = DataExchanger(
             Context(organization=self.organization, project=self.project),
             self.loop_communicator)
@@ -79,6 +120,9 @@ class DetectorNode(Node):
             'VERSION_CONTROL_DEFAULT', 'follow_loop').lower() == 'pause' else VersionMode.FollowLoop
         self.target_model: Optional[ModelInformation] = None
         self.loop_deployment_target: Optional[ModelInformation] = None
+        self.model_store = ModelStore(int(os.environ.get('MODEL_STORE_MAX_MB', '0')) * 1024 * 1024)
+        self._model_downloads: Dict[str, asyncio.Task] = {}
+        """background downloads by model version (see `_prefetch_model`)"""
 
         self._regular_status_sync_cycles: int = int(os.environ.get('SYNC_CYCLES', '6'))
         """sync status every 6 cycles (6*10s = 1min)"""
@@ -102,7 +146,12 @@ class DetectorNode(Node):
             state=self.status.state,
             model_info=self._detector.model_info if isinstance(self._detector, _ActiveDetector) else None,
             target_model=self.target_model.version if self.target_model else None,
-            version_control=self.version_control.value
+            version_control=self.version_control.value,
+            inference_queue_depth=self.inference_scheduler.queue_depth,
+            detection_cache_hits=self.result_cache.hits,
+            detection_cache_misses=self.result_cache.misses,
+            model_warmup_s=self._detector.warmup_s if isinstance(self._detector, _ActiveDetector) else None,
+            standby_model=self._standby.model_info.version if self._standby else None,
         )
 
     def get_model_version_response(self) -> ModelVersionResponse:
@@ -142,6 +191,20 @@ class DetectorNode(Node):
             if self.target_model is not None and self.target_model.version == target_version:
                 return
 
+            if self._standby is not None and self._standby.model_info.version == target_version:
+                # a pointer swap which needs neither idle mode nor the repeat loop lock
+                self.target_model = self._standby.model_info
+                self._switch_to_standby(self.target_model)
+                background_tasks.create(self._sync_status_with_loop())
+                return
+
+            stored_model = self.model_store.model_info(target_version)
+            if stored_model is not None:
+                self.log.info('Model %s is already stored locally; no need to ask the loop', target_version)
+                self.target_model = stored_model
+                background_tasks.create(self._update_to_stored_model(stored_model))
+                return
+
             # Fetch the model uuid by version from the loop
             uri = f'/{self.organization}/projects/{self.project}/models'
             response = await self.loop_communicator.get(uri)
@@ -165,6 +228,7 @@ class DetectorNode(Node):
                                                  host=model_host, categories=[],
                                                  id=model_id,
                                                  version=target_version)
+            self._prefetch_model(self.target_model)
 
     async def soft_reload(self) -> None:
         # simulate init
@@ -193,14 +257,24 @@ class DetectorNode(Node):
             self.outbox.ensure_continuous_upload()
             current_model_dir = self._current_model_path()
             if current_model_dir and os.path.isdir(current_model_dir):
-                await self._build_and_swap_detector(current_model_dir)
+                try:
+                    await self._build_and_swap_detector(current_model_dir)
+                except Exception:
+                    self.model_store.touch(os.path.basename(current_model_dir), build_succeeded=False)
+                    raise
+                self.model_store.touch(os.path.basename(current_model_dir), build_succeeded=True)
         except Exception:
             self.log.exception("error during 'startup'")
         self.operation_mode = OperationMode.Idle
 
     async def on_shutdown(self) -> None:
         try:
-            await self.outbox.ensure_continuous_upload_stopped()
+            for download in self._model_downloads.values():
+                download.cancel()
+            await self.inference_scheduler.shutdown()
+            self.decode_stage.shutdown()
+            self.postprocess_stage.shutdown()
+            await self.outbox.stop()
             for sid in self.connected_clients:
                 # pylint: disable=no-member
                 await self.sio.disconnect(sid)  # type:ignore
@@ -237,7 +311,14 @@ class DetectorNode(Node):
             - source: Optional source string
             - autoupload: Optional 'filtered', 'all' or 'disabled' (default: 'filtered')
             - creation_date: Optional creation date in isoformat string
+            - latest_frame_only: Optional bool; a newer frame of the same camera_id replaces this one while waiting
+            - priority: Optional 'interactive', 'bulk' or 'background' (default: 'interactive')
+            - response_format: Optional 'json', 'msgpack' or 'columnar' (default: 'json')
             """
+            try:
+                response_format = check_response_format(data.get('response_format', 'json'))
+            except UnsupportedResponseFormatError as e:
+                return {'error': str(e)}
             try:
                 image = numpy_image_from_dict(data['image'])
             except Exception:
@@ -251,9 +332,16 @@ class DetectorNode(Node):
                     tags=data.get('tags', []),
                     source=data.get('source', None),
                     autoupload=data.get('autoupload', 'filtered'),
-                    creation_date=data.get('creation_date', None)
+                    creation_date=data.get('creation_date', None),
+                    latest_frame_only=data.get('latest_frame_only', False),
+                    priority=DetectionPriority(data.get('priority', DetectionPriority.Interactive)),
+                    client_id=sid,
                 )
-                return jsonable_encoder(asdict(det))
+                return await self.postprocess_stage.run(encode_detections, det, response_format)
+            except DetectorOverloadedError as e:
+                return {'error': 'overloaded', 'retry_after': e.retry_after_s}
+            except FrameSupersededError:
+                return {'error': 'superseded'}
             except DetectorUnavailableError as e:
                 return {'error': str(e)}
             except Exception as e:
@@ -266,8 +354,12 @@ class DetectorNode(Node):
             Detect objects in a batch of images sent via SocketIO.
 
             Data dict follows the schema of the detect endpoint,
-            but 'images' is a list of image dicts.
+            but 'images' is a list of image dicts and 'priority' defaults to 'bulk'.
             """
+            try:
+                response_format = check_response_format(data.get('response_format', 'json'))
+            except UnsupportedResponseFormatError as e:
+                return {'error': str(e)}
             try:
                 images_data = data['images']
                 images = [numpy_image_from_dict(image) for image in images_data]
@@ -282,9 +374,13 @@ class DetectorNode(Node):
                     camera_id=data.get('camera_id', None),
                     source=data.get('source', None),
                     autoupload=data.get('autoupload', 'filtered'),
-                    creation_date=data.get('creation_date', None)
+                    creation_date=data.get('creation_date', None),
+                    priority=DetectionPriority(data.get('priority', DetectionPriority.Bulk)),
+                    client_id=sid,
                 )
-                return jsonable_encoder(asdict(det))
+                return await self.postprocess_stage.run(encode_detections, det, response_format)
+            except DetectorOverloadedError as e:
+                return {'error': 'overloaded', 'retry_after': e.retry_after_s}
             except DetectorUnavailableError as e:
                 return {'error': str(e)}
             except Exception as e:
@@ -346,7 +442,7 @@ class DetectorNode(Node):
             metadata = data.get('metadata', None)
             if metadata:
                 try:
-                    image_metadata = from_dict(data_class=ImageMetadata, data=metadata)
+                    image_metadata = from_jsonable(ImageMetadata, metadata)
                 except Exception as e:
                     self.log.exception('could not parse detections')
                     return {'error': str(e)}
@@ -416,7 +512,7 @@ class DetectorNode(Node):
 
         try:
             response = await self.loop_communicator.post(
-                f'/{self.organization}/projects/{self.project}/detectors', json=jsonable_encoder(asdict(status)))
+                f'/{self.organization}/projects/{self.project}/detectors', json=as_jsonable(status))
         except Exception:
             self.log.warning('Exception while trying to sync status with loop')
 
@@ -427,12 +523,10 @@ class DetectorNode(Node):
         """Check if a new model is available and update if necessary.
         The Learning Loop will respond with the model info of the deployment target.
         If version_control is set to FollowLoop or the chosen target model is not used,
-        the detector will update the target_model."""
+        the detector will update the target_model.
+        A new target model is downloaded in the background right away; it is built and swapped in
+        once the download is complete and the node is idle."""
         try:
-            if self.operation_mode != OperationMode.Idle:
-                self.log.debug('not checking for updates; operation mode is %s', self.operation_mode)
-                return
-
             await self._check_for_new_deployment_target()
 
             self.status.reset_error('update_model')
@@ -440,6 +534,12 @@ class DetectorNode(Node):
                 self.log.debug('not running any updates; target model is None')
                 return
 
+            download = self._prefetch_model(self.target_model)
+
+            if self.operation_mode != OperationMode.Idle:
+                self.log.debug('not updating the model; operation mode is %s', self.operation_mode)
+                return
+
             match self._detector:
                 case _ActiveDetector(model_info=info):
                     current_version = info.version
@@ -450,6 +550,9 @@ class DetectorNode(Node):
                     current_version = None
 
             if current_version != self.target_model.version:
+                if download is not None:
+                    self.log.debug('not updating the model; waiting for download of %s', self.target_model.version)
+                    return
                 self.log.info('Updating model from %s to %s',
                               current_version or "-", self.target_model.version)
                 await self._update_model(self.target_model)
@@ -490,49 +593,119 @@ class DetectorNode(Node):
             self.log.info('Deployment target changed from %s to %s',
                           previous_version, self.target_model.version)
 
+    async def _update_to_stored_model(self, model: ModelInformation) -> None:
+        """Build and swap in a stored model right away instead of waiting for the next repeat cycle.
+
+        Runs in the background under the repeat loop lock, so the caller is not blocked by the build
+        and the update can not interleave with `_update_model_if_required`.
+        """
+        async with self.repeat_loop_lock:
+            if self.target_model != model or self._current_version() == model.version:
+                return  # superseded or already done by the repeat cycle
+            if self.operation_mode != OperationMode.Idle:
+                self.log.debug('not updating the model; operation mode is %s', self.operation_mode)
+                return
+            await self._update_model(model)
+
     async def _update_model(self, target_model: ModelInformation) -> None:
-        """Download and install the target model.
+        """Download (if not done yet) and install the target model.
         On failure, the target_model will be set to None which will trigger a retry on the next check."""
+        target_model_folder = self.model_store.folder(target_model.version)
+        if self._switch_to_standby(target_model):
+            await self._sync_status_with_loop()
+            return
 
-        with step_into(GLOBALS.data_folder):
-            target_model_folder = f'models/{target_model.version}'
-            if os.path.exists(target_model_folder) and len(os.listdir(target_model_folder)) > 0:
-                self.log.info('No need to download model. %s (already exists)', target_model.version)
-            else:
-                os.makedirs(target_model_folder, exist_ok=True)
-                try:
-                    await self.data_exchanger.download_model(target_model_folder,
-                                                             Context(organization=self.organization,
-                                                                     project=self.project),
-                                                             target_model.id, self._detector_factory.model_format)
-                    self.log.info('Downloaded model %s', target_model.version)
-                except Exception:
-                    self.log.exception('Could not download model %s', target_model.version)
-                    shutil.rmtree(target_model_folder, ignore_errors=True)
-                    self.target_model = None
-                    return
-
-            try:
-                await self._build_and_swap_detector(target_model_folder)
-            except NodeNeedsRestartError:
-                self.log.error('Node needs restart')
-                sys.exit(0)
-            except Exception:
-                self.log.exception('Could not build detector, will retry download on next check')
-                shutil.rmtree(target_model_folder, ignore_errors=True)
-                self.target_model = None
+        download = self._prefetch_model(target_model)
+        if download is None:
+            self.log.info('No need to download model. %s (already exists)', target_model.version)
+        else:
+            await asyncio.wait([download])
+            if download.cancelled() or not download.result():
                 return
 
-            self._update_current_model_symlink(target_model_folder)
-            await self._sync_status_with_loop()
+        try:
+            await self._build_and_swap_detector(target_model_folder)
+        except NodeNeedsRestartError:
+            self.log.error('Node needs restart')
+            sys.exit(0)
+        except Exception:
+            self.log.exception('Could not build detector, will retry download on next check')
+            self.model_store.remove(target_model.version)
+            self.target_model = None
+            return
+
+        self._update_current_model_symlink(target_model_folder)
+        self.model_store.touch(target_model.version, build_succeeded=True)
+        self.model_store.evict(keep=self._versions_in_use())
+        await self._sync_status_with_loop()
+
+    def _current_version(self) -> Optional[str]:
+        return self._detector.model_info.version if isinstance(self._detector, _ActiveDetector) else None
+
+    def _versions_in_use(self) -> List[Optional[str]]:
+        """Versions which must not be evicted from the model store (current, standby, target and downloading models)."""
+        return [self._current_version(), self._standby.model_info.version if self._standby else None,
+                self.target_model.version if self.target_model else None, *self._model_downloads]
+
+    def _prefetch_model(self, model: ModelInformation) -> Optional[asyncio.Task]:
+        """Start downloading the model in the background unless it is already on disk or being downloaded.
+        Downloads of other versions are cancelled because they are no longer the target.
+
+        :return: the running download task or None if the model is already on disk
+        """
+        if self.model_store.contains(model.version):
+            return None
+        download = self._model_downloads.get(model.version)
+        if download is None:
+            for obsolete in self._model_downloads.values():
+                obsolete.cancel()
+            download = asyncio.create_task(self._download_model(model))
+            self._model_downloads = {model.version: download}
+        return download
+
+    async def _download_model(self, model: ModelInformation) -> bool:
+        """Download the model into a temporary folder which is renamed to the model folder once complete.
+        On failure, the target_model is set to None (if it is still this model) to retry on the next check.
+
+        :return: whether the download succeeded
+        """
+        target_model_folder = self.model_store.folder(model.version)
+        download_folder = f'{target_model_folder}.download'
+        shutil.rmtree(download_folder, ignore_errors=True)
+        os.makedirs(download_folder)
+        try:
+            self.log.info('Downloading model %s in the background', model.version)
+            await self.data_exchanger.download_model(download_folder,
+                                                     Context(organization=self.organization, project=self.project),
+                                                     model.id, self._detector_factory.model_format)
+            shutil.rmtree(target_model_folder, ignore_errors=True)
+            os.rename(download_folder, target_model_folder)
+            self.log.info('Downloaded model %s', model.version)
+            self.model_store.touch(model.version)
+            self.model_store.evict(keep=self._versions_in_use())
+            return True
+        except Exception as e:
+            self.log.exception('Could not download model %s', model.version)
+            msg = e.cause if isinstance(e, DownloadError) else str(e)
+            self.status.set_error('update_model', f'Could not download model: {msg}')
+            if self.target_model is not None and self.target_model.version == model.version:
+                self.target_model = None
+            return False
+        finally:
+            shutil.rmtree(download_folder, ignore_errors=True)
+            if self._model_downloads.get(model.version) is asyncio.current_task():
+                del self._model_downloads[model.version]
 
     async def _build_and_swap_detector(self, model_dir: str) -> None:
         """Load ModelInformation from model_dir, build a new DetectorLogic via the factory,
         then atomically swap self._detector when ready.
+        In pool mode (DETECTOR_REPLICAS > 1) the factory is called once per replica and the whole pool is swapped.
         The old detector continues to serve requests until the swap.
 
         If EXCLUSIVE_MODEL_BUILD is set and a detector is active, the old detector is torn down
         first (freeing e.g. GPU VRAM) and detections are rejected until the new one is ready.
+        With MODEL_WARMUP_RUNS > 0 the new detectors are warmed up before the swap (see `_warm_up`).
+        With STANDBY_DETECTOR_MAX_MB > 0 the old detector is kept as standby (see `_keep_as_standby`).
         """
         logging.info('Loading model from %s', model_dir)
         model_info = ModelInformation.load_from_disk(os.path.abspath(model_dir))
@@ -541,22 +714,26 @@ class DetectorNode(Node):
             raise Exception('model.json not found')
 
         if self._exclusive_model_build and isinstance(self._detector, _ActiveDetector):
-            async with self.detection_lock:
-                old_logic = self._detector.logic
+            async with self._all_detection_locks():
+                old_logics = self._detector.pool
                 self._detector = _Updating(version=model_info.version)
 
-                # Ensure that we actually delete the old DetectorLogic here to
-                # free resources before building a new detector.
-                refcount = sys.getrefcount(old_logic)  # 2 = old_logic local + getrefcount arg
-                assert refcount == 2, f'expected 2 refs to old detector logic, got {refcount}'
-                del old_logic
+                # Ensure that we actually delete the old DetectorLogic instances here to
+                # free resources before building new detectors.
+                refcounts = [sys.getrefcount(old_logics[i]) for i in range(len(old_logics))]  # 2 = list + arg
+                assert all(r == 2 for r in refcounts), f'expected 2 refs to old detector logics, got {refcounts}'
+                del old_logics
                 gc.collect()
 
+        memory_before = _resident_memory_bytes()
         try:
-            new_detector = await self._detector_factory.build(model_info)
-            logging.info('Successfully built detector for model %s', model_info)
+            new_pool: List[DetectorLogic] = []
+            for _ in range(self._num_replicas):
+                new_pool.append(await build_detector_logic(self._detector_factory, model_info))
+            logging.info('Successfully built %d detector(s) for model %s', len(new_pool), model_info)
             self._remaining_init_attempts = 2
         except Exception as e:
+            del new_pool  # release replicas which were already built
             self._remaining_init_attempts -= 1
             logging.error('Could not build detector for model %s. Retries left: %s. Error: %s',
                           model_info, self._remaining_init_attempts, e)
@@ -565,7 +742,101 @@ class DetectorNode(Node):
             if self._remaining_init_attempts == 0:
                 raise NodeNeedsRestartError('Could not build detector') from None
             raise
-        self._detector = _ActiveDetector(new_detector, model_info)
+        new_detector = _ActiveDetector(new_pool[0], model_info, replicas=new_pool[1:],
+                                       category_ids=category_index(model_info.categories))
+        if self._warmup_runs:
+            await self._warm_up(new_detector)
+        memory_after = _resident_memory_bytes()  # after the warm-up, which may allocate lazily initialized buffers
+        if memory_before is not None and memory_after is not None:
+            new_detector.memory_bytes = memory_after - memory_before
+        previous_detector = self._detector
+        # a single assignment swaps the whole pool at once
+        self._detector = new_detector
+        self._keep_as_standby(previous_detector)
+        self.result_cache.clear()
+        self.motion_gate.clear()
+
+    def _keep_as_standby(self, detector: '_DetectorState') -> None:
+        """Keep the replaced detector loaded (instead of the previous standby) if it fits into the memory budget.
+
+        The memory of a detector is estimated by the growth of the node's resident memory while it was built and
+        warmed up; memory of worker processes (PROCESS_INFERENCE) or GPU memory is not included.
+        If the memory can not be determined, the detector is not kept.
+        There is no standby with EXCLUSIVE_MODEL_BUILD because the old detector is torn down before the build.
+        """
+        self._standby = None
+        if not isinstance(detector, _ActiveDetector) or not self._standby_max_bytes or self._exclusive_model_build:
+            return
+        if detector.memory_bytes is None:
+            self.log.info('Not keeping model %s as standby: its memory is unknown', detector.model_info.version)
+            return
+        if detector.memory_bytes > self._standby_max_bytes:
+            self.log.info('Not keeping model %s as standby: %d bytes exceed the budget of %d bytes',
+                          detector.model_info.version, detector.memory_bytes, self._standby_max_bytes)
+            return
+        self._standby = detector
+        self.log.info('Keeping model %s as standby', detector.model_info.version)
+
+    def _switch_to_standby(self, target_model: ModelInformation) -> bool:
+        """Activate the standby detector if it holds the target model and mark the model as current on disk.
+
+        :return: whether the standby detector was activated
+        """
+        if not self._activate_standby(target_model.version):
+            return False
+        self._update_current_model_symlink(self.model_store.folder(target_model.version))
+        self.model_store.touch(target_model.version)
+        return True
+
+    def _activate_standby(self, version: str) -> bool:
+        """Swap in the standby detector if it holds the given model version. The active detector becomes the standby.
+
+        :return: whether the standby detector was activated
+        """
+        standby = self._standby
+        if standby is None or standby.model_info.version != version:
+            return False
+        previous_detector = self._detector
+        self._detector = standby
+        self._keep_as_standby(previous_detector)
+        self.result_cache.clear()
+        self.motion_gate.clear()
+        self.log.info('Switched to standby model %s', version)
+        return True
+
+    async def _warm_up(self, detector: '_ActiveDetector') -> None:
+        """Evaluate blank images at the model resolution (640 px if unknown) with every replica of the new detector.
+
+        The first evaluations of a model often pay for lazy initialization (memory allocation, engine compilation, ...).
+        If batching is enabled, `batch_evaluate` is warmed up with a full batch as well.
+        Errors are logged and do not prevent the swap.
+        """
+        resolution = detector.model_info.resolution or 640
+        image = np.zeros((resolution, resolution, 3), dtype=np.uint8)
+        batch_size = self.inference_scheduler.max_batch_size
+        start = time.perf_counter()
+        try:
+            for logic in detector.pool:
+                for _ in range(self._warmup_runs):
+                    await run.io_bound(logic.evaluate, image)
+                    if batch_size > 1 and detector.supports_batch:
+                        try:
+                            await run.io_bound(logic.batch_evaluate, [image] * batch_size)
+                        except NotImplementedError:
+                            detector.supports_batch = False
+        except Exception:
+            self.log.exception('Warm-up of model %s failed', detector.model_info.version)
+        detector.warmup_s = time.perf_counter() - start
+        self.log.info('Warmed up model %s with %d run(s) per replica in %.3f s',
+                      detector.model_info.version, self._warmup_runs, detector.warmup_s)
+
+    @contextlib.asynccontextmanager
+    async def _all_detection_locks(self):
+        """Wait until no replica is evaluating and block all replicas while inside the context."""
+        async with contextlib.AsyncExitStack() as stack:
+            for lock in self.detection_locks:
+                await stack.enter_async_context(lock)
+            yield
 
     @staticmethod
     def _current_model_path() -> Optional[str]:
@@ -603,30 +874,64 @@ class DetectorNode(Node):
             self.log.error('could not reload app')
 
     async def get_detections(self,
-                             image: np.ndarray,
+                             image: Union[np.ndarray, bytes],
                              tags: List[str],
                              *,
                              camera_id: Optional[str] = None,
                              source: Optional[str] = None,
                              autoupload: Literal['filtered', 'all', 'disabled'],
-                             creation_date: Optional[str] = None) -> ImageMetadata:
+                             creation_date: Optional[str] = None,
+                             latest_frame_only: bool = False,
+                             priority: DetectionPriority = DetectionPriority.Interactive,
+                             client_id: Optional[str] = None) -> ImageMetadata:
         """
         Main processing function for the detector node.
 
         Used when an image is received via REST or SocketIO.
+        The image is either an ndarray or the bytes of an encoded image file (e.g. JPEG).
         This function infers the detections from the image,
         cares about uploading to the loop and returns the detections as ImageMetadata object.
+        Concurrent requests may be evaluated together (see DETECTION_BATCH_SIZE).
+        With latest_frame_only, a newer frame of the same camera_id replaces this one while it is still waiting
+        (raising FrameSupersededError).
+        Waiting requests are scheduled by priority and fairly shared between cameras (or clients if no camera_id is given).
+        If DETECTION_CACHE_SIZE is set, byte-identical images are not evaluated again but answered from the cache
+        (without decoding them).
+        Encoded JPEGs are passed to the outbox as they are, so autouploads do not re-encode them.
+        If DECODE_TO_MODEL_RESOLUTION is set, JPEGs are decoded at a reduced scale which is still larger than the
+        model resolution; the detections are scaled back to the original image size.
+        If MOTION_GATE_THRESHOLD is set, frames of a camera_id which hardly changed since its last evaluated frame
+        are not evaluated; the previous detections are returned instead (tagged as 'reused').
+        The image passes through pipeline stages with their own bounded worker pools: hashing, decoding and motion
+        thumbnails run in the decode stage, the forward pass in a detector slot of the inference scheduler and
+        scaling and converting the detections in the postprocess stage (see DECODE_WORKERS and POSTPROCESS_WORKERS).
+        A detector slot is therefore only occupied while the detector evaluates the image.
         Raises exception if no model is loaded.
         """
-        async with self.detection_lock:
-            detector = _unwrap_detector(self._detector)
-            metadata = await run.io_bound(detector.logic.evaluate, image)
+        model_version = self._detector.model_info.version if isinstance(self._detector, _ActiveDetector) else None
+        use_motion_gate = bool(self.motion_gate.enabled and camera_id and model_version)
+        pre = await self.decode_stage.run(self._preprocess, image, model_version, use_motion_gate)
+        metadata = pre.cached
+        if metadata is None and pre.thumbnail is not None:
+            assert camera_id and model_version
+            metadata = self.motion_gate.lookup(camera_id, pre.thumbnail, model_version)
+        if metadata is None:
+            assert pre.decoded is not None
+            metadata, used_version = await self.inference_scheduler.submit(
+                pre.decoded, priority=priority, key=camera_id or client_id,
+                camera_id=camera_id, latest_frame_only=latest_frame_only)
+            metadata = await self.postprocess_stage.run(_postprocess, metadata, pre.scale)
+            if pre.thumbnail is not None:
+                assert camera_id
+                self.motion_gate.update(camera_id, pre.thumbnail, used_version, metadata)
+            if pre.cache_key is not None and pre.cache_key[1] == used_version:
+                self.result_cache.put(pre.cache_key, metadata)  # not if the model changed in the meantime
 
         metadata.tags.extend(tags)
         metadata.source = source
         metadata.created = creation_date
 
-        fix_shape_detections(metadata)
+        fix_shape_detections(metadata)  # no-op for detections which went through the postprocess stage
         n_bo, n_cl = len(metadata.box_detections), len(metadata.classification_detections)
         n_po, n_se = len(metadata.point_detections), len(metadata.segmentation_detections)
         self.log.debug('Detected: %d boxes, %d points, %d segs, %d classes', n_bo, n_po, n_se, n_cl)
@@ -648,49 +953,101 @@ class DetectorNode(Node):
                                    camera_id: Optional[str] = None,
                                    source: Optional[str] = None,
                                    autoupload: str = 'filtered',
-                                   creation_date: Optional[str] = None) -> ImagesMetadata:
+                                   creation_date: Optional[str] = None,
+                                   priority: DetectionPriority = DetectionPriority.Bulk,
+                                   client_id: Optional[str] = None) -> ImagesMetadata:
         """
         Processing function for the detector node when a batch inference is requested via SocketIO.
 
         This function infers the detections from all images,
         cares about uploading to the loop and returns the detections as a list of ImageMetadata.
+        The batch is scheduled as one request (see get_detections).
         Raises exception if no model is loaded.
         """
-        async with self.detection_lock:
-            detector = _unwrap_detector(self._detector)
-            all_detections = await run.io_bound(detector.logic.batch_evaluate, images)
+        results = await self.inference_scheduler.submit_batch(images, priority=priority, key=camera_id or client_id)
+        all_detections = ImagesMetadata(items=[metadata for metadata, _ in results])
 
         for metadata in all_detections.items:
             metadata.tags.extend(tags)
             metadata.source = source
             metadata.created = creation_date
 
-        for detections, image in zip(all_detections.items, images):
-            fix_shape_detections(detections)
+        await self.postprocess_stage.run(lambda: [fix_shape_detections(metadata) for metadata in all_detections.items])
+        for detections, image in zip(all_detections.items, images, strict=True):
             n_bo, n_cl = len(detections.box_detections), len(detections.classification_detections)
             n_po, n_se = len(detections.point_detections), len(detections.segmentation_detections)
             self.log.debug('Detected: %d boxes, %d points, %d segs, %d classes', n_bo, n_po, n_se, n_cl)
 
             if autoupload == 'filtered':
                 background_tasks.create(self.relevance_filter.may_upload_detections(detections, camera_id, image))
-            elif autoupload == 'all':
-                background_tasks.create(self.outbox.save(image, detections))
-            elif autoupload == 'disabled':
-                pass
-            else:
-                self.log.error('unknown autoupload value %s', autoupload)
+
+        if autoupload == 'all':
+            background_tasks.create(self.outbox.save_many(images, all_detections.items))
+        elif autoupload not in ('filtered', 'disabled'):
+            self.log.error('unknown autoupload value %s', autoupload)
         return all_detections
 
+    def _preprocess(self, image: Union[np.ndarray, bytes], model_version: Optional[str],
+                    with_thumbnail: bool) -> '_Preprocessed':
+        """Run the decode stage for one image in a single job.
+
+        Looks up the result cache (if enabled and a model is loaded); on a miss the image is decoded for inference
+        (see `_decode_for_inference`) and its motion gate thumbnail is computed.
+        """
+        result = _Preprocessed()
+        if self.result_cache.enabled and model_version:
+            result.cache_key = self.result_cache.key(image, model_version)
+            result.cached = self.result_cache.get(result.cache_key)
+            if result.cached is not None:
+                return result
+        result.decoded, result.scale = self._decode_for_inference(image)
+        if with_thumbnail:
+            result.thumbnail = self.motion_gate.thumbnail(result.decoded)
+        return result
+
+    def _decode_for_inference(self, image: Union[np.ndarray, bytes]) -> Tuple[np.ndarray, Optional[Tuple[float, float]]]:
+        """Decode the image if necessary and return it with the (x, y) factors to scale detections to the original size
+        (None if the image was decoded at its original size)."""
+        if isinstance(image, np.ndarray):
+            return image, None
+        min_size = None
+        if self._decode_to_model_resolution and isinstance(self._detector, _ActiveDetector):
+            min_size = self._detector.model_info.resolution
+        decoded, (width, height) = decode_image_bytes(image, min_size)
+        if decoded.shape[:2] == (height, width):
+            return decoded, None
+        return decoded, (width / decoded.shape[1], height / decoded.shape[0])
+
+    async def _evaluate_images(self, images: List[np.ndarray], slot: int) -> List[Tuple[ImageMetadata, str]]:
+        """Evaluate the images collected by the inference scheduler with the given replica of the active detector.
+
+        Returns the detections of each image together with the version of the model which produced them.
+        Uses `batch_evaluate` for more than one image and falls back to evaluating the images one by one
+        if the detector does not implement batch evaluation.
+        """
+        async with self.detection_locks[slot]:
+            detector = _unwrap_detector(self._detector)
+            version = detector.model_info.version
+            logic = detector.pool[slot]
+            if len(images) > 1 and detector.supports_batch:
+                try:
+                    batch = await run.io_bound(logic.batch_evaluate, images)
+                    return [(metadata, version) for metadata in batch.items]
+                except NotImplementedError:
+                    self.log.info('Detector does not implement batch_evaluate; evaluating images one by one')
+                    detector.supports_batch = False
+            return await run.io_bound(lambda: [(logic.evaluate(image), version) for image in images])
+
     async def upload_images(
             self, *,
-            images: List[np.ndarray],
+            images: Sequence[Union[np.ndarray, bytes]],
             images_metadata: Optional[ImagesMetadata] = None,
             upload_priority: bool = False
     ) -> None:
-        """Save images to the outbox using an asyncio executor.
+        """Save images to the outbox; they are encoded and written in parallel by the outbox encoder pool.
         Used by SIO and REST upload endpoints.
 
-        :param images: List of images to upload
+        :param images: List of images to upload (ndarrays or encoded image files; JPEGs are saved without re-encoding)
         :param images_metadata: Optional metadata for all images
         :param upload_priority: Whether to upload the images with priority
         :raises ValueError: If the number of images and number of metadata items do not match
@@ -699,32 +1056,21 @@ class DetectorNode(Node):
         if images_metadata and len(images_metadata.items) != len(images):
             raise ValueError('Number of images and number of metadata items do not match')
 
-        for i, image in enumerate(images):
-            image_metadata = images_metadata.items[i] if images_metadata else ImageMetadata()
+        metadata = images_metadata.items if images_metadata else [ImageMetadata() for _ in images]
+        for image_metadata in metadata:
             image_metadata.tags.append('picked_by_system')
-            await self.outbox.save(image, image_metadata, upload_priority)
+        await self.outbox.save_many(images, metadata, upload_priority)
 
     def add_category_id_to_detections(self, model_info: ModelInformation, image_metadata: ImageMetadata):
-        def find_category_id_by_name(categories: List[Category], category_name: str):
-            category_id = [category.id for category in categories if category.name == category_name]
-            return category_id[0] if category_id else ''
-
-        for box_detection in image_metadata.box_detections:
-            category_name = box_detection.category_name
-            category_id = find_category_id_by_name(model_info.categories, category_name)
-            box_detection.category_id = category_id
-        for point_detection in image_metadata.point_detections:
-            category_name = point_detection.category_name
-            category_id = find_category_id_by_name(model_info.categories, category_name)
-            point_detection.category_id = category_id
-        for segmentation_detection in image_metadata.segmentation_detections:
-            category_name = segmentation_detection.category_name
-            category_id = find_category_id_by_name(model_info.categories, category_name)
-            segmentation_detection.category_id = category_id
-        for classification_detection in image_metadata.classification_detections:
-            category_name = classification_detection.category_name
-            category_id = find_category_id_by_name(model_info.categories, category_name)
-            classification_detection.category_id = category_id
+        """Set the category_id of all detections by their category_name ('' if the model has no such category)."""
+        if isinstance(self._detector, _ActiveDetector) and self._detector.model_info is model_info:
+            category_ids = self._detector.category_ids
+        else:
+            category_ids = category_index(model_info.categories)
+
+        for detection in (*image_metadata.box_detections, *image_metadata.point_detections,
+                          *image_metadata.segmentation_detections, *image_metadata.classification_detections):
+            detection.category_id = category_ids.get(detection.category_name, '')
         return image_metadata
 
     def register_sio_events(self, sio_client: AsyncClient):
@@ -741,10 +1087,36 @@ class _Updating:
     version: str
 
 
+@dataclass
+class _Preprocessed:
+    """Result of the decode stage for one image."""
+    cache_key: Optional[Tuple[bytes, str]] = None
+    cached: Optional[ImageMetadata] = None
+    """cached detections (the image was not decoded then)"""
+    decoded: Optional[np.ndarray] = None
+    scale: Optional[Tuple[float, float]] = None
+    """(x, y) factors to scale detections to the original image size"""
+    thumbnail: Optional[np.ndarray] = None
+
+
 @dataclass
 class _ActiveDetector:
     logic: DetectorLogic
     model_info: ModelInformation
+    replicas: List[DetectorLogic] = field(default_factory=list)
+    """additional instances of the same model (pool mode)"""
+    supports_batch: bool = True
+    """set to False once batch_evaluate raised NotImplementedError"""
+    category_ids: Dict[str, str] = field(default_factory=dict)
+    """category name -> id of the model's categories"""
+    warmup_s: Optional[float] = None
+    """duration of the warm-up before the detector was activated (None if it was not warmed up)"""
+    memory_bytes: Optional[int] = None
+    """growth of the node's resident memory while the pool was built and warmed up (None if unknown)"""
+
+    @property
+    def pool(self) -> List[DetectorLogic]:
+        return [self.logic, *self.replicas]
 
 
 _DetectorState = Union[_Initializing, _Updating, _ActiveDetector]
@@ -765,14 +1137,46 @@ def _unwrap_detector(state: '_DetectorState') -> _ActiveDetector:
             raise DetectorUnavailableError('detector not yet initialized')
 
 
-@contextlib.contextmanager
-def step_into(new_dir):
-    previous_dir = os.getcwd()
-    os.chdir(new_dir)
+def _resident_memory_bytes() -> Optional[int]:
+    """Return the resident memory of the node process (None if it can not be determined, e.g. on macOS)."""
     try:
-        yield
-    finally:
-        os.chdir(previous_dir)
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def category_index(categories: List[Category]) -> Dict[str, str]:
+    """Map category names to ids (the first category wins if names are not unique)."""
+    index: Dict[str, str] = {}
+    for category in categories:
+        index.setdefault(category.name, category.id)
+    return index
+
+
+def scale_detections(metadata: ImageMetadata, scale_x: float, scale_y: float) -> None:
+    """Scale the coordinates of box, point and segmentation detections in place (e.g. to the original image size)."""
+    for box in metadata.box_detections:
+        box.x, box.width = round(box.x * scale_x), round(box.width * scale_x)
+        box.y, box.height = round(box.y * scale_y), round(box.height * scale_y)
+    for point in metadata.point_detections:
+        point.x, point.y = point.x * scale_x, point.y * scale_y
+    for seg_detection in metadata.segmentation_detections:
+        if isinstance(seg_detection.shape, Shape):
+            for p in seg_detection.shape.points:
+                p.x, p.y = round(p.x * scale_x), round(p.y * scale_y)
+        else:  # comma separated x,y values
+            values = [float(v) for v in seg_detection.shape.split(',')]
+            seg_detection.shape = ','.join(str(round(v * (scale_y if i % 2 else scale_x))) for i, v in enumerate(values))
+
+
+def _postprocess(metadata: ImageMetadata, scale: Optional[Tuple[float, float]]) -> ImageMetadata:
+    """Scale the detections to the original image size (if the image was decoded at a reduced scale)
+    and convert segmentation shapes."""
+    if scale is not None:
+        scale_detections(metadata, *scale)
+    fix_shape_detections(metadata)
+    return metadata
 
 
 def fix_shape_detections(metadata: ImageMetadata):
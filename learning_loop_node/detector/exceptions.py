@@ -5,3 +5,35 @@ class NodeNeedsRestartError(Exception):
     NodeNeedsRestartError is raised when the node needs to be restarted.
     This is e.g. the case when the GPU is not available anymore.
     '''
+
+
+class InferenceWorkerError(Exception):
+    '''
+    InferenceWorkerError is raised when an out-of-process inference worker crashed or did not respond in time.
+    The worker is restarted automatically; the node itself keeps running.
+    '''
+
+
+class DetectorOverloadedError(Exception):
+    '''
+    DetectorOverloadedError is raised when a detection request is rejected by the admission control
+    because the inference queue is full or the request waited too long.
+    '''
+
+    def __init__(self, message: str, retry_after_s: int = 1) -> None:
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class FrameSupersededError(Exception):
+    '''
+    FrameSupersededError is raised for a waiting detection request (latest-frame-only mode)
+    when a newer frame from the same camera replaced it before inference started.
+    '''
+
+
+class UnsupportedResponseFormatError(Exception):
+    '''
+    UnsupportedResponseFormatError is raised when a client requests a response format which is unknown
+    or which needs an optional package that is not installed (e.g. msgpack).
+    '''
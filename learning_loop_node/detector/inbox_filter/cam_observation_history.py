@@ -1,82 +1,143 @@
+import math
 import os
-from typing import List, Union
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Set, Union
 
-from ...data_classes import (
-    BoxDetection,
-    ClassificationDetection,
-    ImageMetadata,
-    Observation,
-    PointDetection,
-    SegmentationDetection,
-)
+import numpy as np
 
+from ...data_classes import BoxDetection, ImageMetadata, PointDetection
 
-class CamObservationHistory:
-    def __init__(self) -> None:
-        self.reset_time = 3600
-        self.recent_observations: List[Observation] = []
-        self.iou_threshold = 0.5
-        self.min_uncertain_threshold = float(os.environ.get('MIN_UNCERTAIN_THRESHOLD', '0.3'))
-        self.max_uncertain_threshold = float(os.environ.get('MAX_UNCERTAIN_THRESHOLD', '0.6'))
 
-    def forget_old_detections(self) -> None:
-        self.recent_observations = [detection
-                                    for detection in self.recent_observations
-                                    if not detection.is_older_than(self.reset_time)]
+class ObservationArrays:
+    """Recent observations of one detection type as NumPy arrays.
 
-    def get_causes_to_upload(self, image_metadata: ImageMetadata) -> List[str]:
-        causes = set()
-        for detection in image_metadata.box_detections + image_metadata.point_detections + image_metadata.segmentation_detections + image_metadata.classification_detections:
-            if isinstance(detection, SegmentationDetection):
-                # self.recent_observations.append(Observation(detection))
-                causes.add('segmentation_detection')
-                continue
-            if isinstance(detection, ClassificationDetection):
-                # self.recent_observations.append(Observation(detection))
-                if self.min_uncertain_threshold <= detection.confidence <= self.max_uncertain_threshold:
-                    causes.add('uncertain')
-                continue
-
-            assert isinstance(detection, (BoxDetection, PointDetection)), f"Unknown detection type: {type(detection)}"
-
-            similar = self.find_similar_observations(detection)
-            if any(similar):
-                for s in similar:
-                    s.update_last_seen()
-                continue
+    Row i holds the coordinates, the category code and the last-seen timestamp (`time.monotonic()`) of observation i.
+    """
 
-            self.recent_observations.append(Observation(detection))
-            if self.min_uncertain_threshold <= detection.confidence <= self.max_uncertain_threshold:
-                causes.add('uncertain')
+    def __init__(self, num_coordinates: int) -> None:
+        self.coordinates = np.empty((0, num_coordinates))
+        self.categories = np.empty(0, dtype=np.int64)
+        self.last_seen = np.empty(0)
 
-        return list(causes)
+    def __len__(self) -> int:
+        return len(self.categories)
 
-    def find_similar_observations(self, new_detection: Union[BoxDetection, PointDetection]) -> List[Observation]:
+    def add(self, coordinates: np.ndarray, categories: np.ndarray, now: float) -> None:
+        self.coordinates = np.concatenate((self.coordinates, coordinates))
+        self.categories = np.concatenate((self.categories, categories))
+        self.last_seen = np.concatenate((self.last_seen, np.full(len(categories), now)))
 
-        if isinstance(new_detection, BoxDetection):
-            return self.find_similar_box_observations(new_detection)
+    def keep(self, mask: np.ndarray) -> None:
+        self.coordinates = self.coordinates[mask]
+        self.categories = self.categories[mask]
+        self.last_seen = self.last_seen[mask]
 
-        if isinstance(new_detection, PointDetection):
-            return self.find_similar_point_observations(new_detection)
 
-        return []
+class CamObservationHistory:
+    """Recent box and point observations of a camera.
 
-    def find_similar_box_observations(self, new_detection: BoxDetection) -> List[Observation]:
-        similar = []
-        for observation in self.recent_observations:
-            if (isinstance(observation.detection, BoxDetection) and
-                observation.detection.category_name == new_detection.category_name and
-                    new_detection.intersection_over_union(observation.detection) >= self.iou_threshold):
-                similar.append(observation)
+    A new box (point) is similar to an observation of the same category if their IoU is at least `iou_threshold`
+    (their distance is less than `max_point_distance`).
+    All detections of an ImageMetadata are compared with the history in one vectorized pass.
+    Observations which were not seen for `reset_time` seconds expire lazily: the history knows when its oldest
+    observation expires and only scans its observations once that time has passed.
+    """
 
-        return similar
+    def __init__(self) -> None:
+        self.reset_time = 3600
+        self.iou_threshold = 0.5
+        self.max_point_distance = 10
+        self.min_uncertain_threshold = float(os.environ.get('MIN_UNCERTAIN_THRESHOLD', '0.3'))
+        self.max_uncertain_threshold = float(os.environ.get('MAX_UNCERTAIN_THRESHOLD', '0.6'))
+        self.boxes = ObservationArrays(4)
+        """x, y, width and height of recent box observations"""
+        self.points = ObservationArrays(2)
+        """x and y of recent point observations"""
+        self._category_codes: Dict[str, int] = {}
+        self._next_expiry = math.inf
+        """monotonic time at which the oldest observation expires (refreshing observations only delays it)"""
+
+    def __len__(self) -> int:
+        return len(self.boxes) + len(self.points)
+
+    def forget_old_detections(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        if now < self._next_expiry:
+            return
+        threshold = now - self.reset_time
+        self._next_expiry = math.inf
+        for observations in (self.boxes, self.points):
+            observations.keep(observations.last_seen >= threshold)
+            if len(observations):
+                self._next_expiry = min(self._next_expiry, observations.last_seen.min() + self.reset_time)
 
-    def find_similar_point_observations(self, new_detection: PointDetection) -> List[Observation]:
-        similar = []
-        for observation in self.recent_observations:
-            if (isinstance(observation.detection, PointDetection) and
-                observation.detection.category_name == new_detection.category_name and
-                    new_detection.distance(observation.detection) < 10):
-                similar.append(observation)
+    def get_causes_to_upload(self, image_metadata: ImageMetadata) -> List[str]:
+        causes: Set[str] = set()
+        now = time.monotonic()
+        boxes = image_metadata.box_detections
+        if boxes:
+            coordinates = np.array([[b.x, b.y, b.width, b.height] for b in boxes], dtype=float)
+            self._add_new_observations(self.boxes, boxes, coordinates, self._similar_boxes, now, causes)
+        points = image_metadata.point_detections
+        if points:
+            coordinates = np.array([[p.x, p.y] for p in points], dtype=float)
+            self._add_new_observations(self.points, points, coordinates, self._similar_points, now, causes)
+        if image_metadata.segmentation_detections:
+            causes.add('segmentation_detection')
+        if any(self._is_uncertain(detection.confidence) for detection in image_metadata.classification_detections):
+            causes.add('uncertain')
+        return list(causes)
 
-        return similar
+    def _add_new_observations(self,
+                              observations: ObservationArrays,
+                              detections: Sequence[Union[BoxDetection, PointDetection]],
+                              coordinates: np.ndarray,
+                              similar: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+                              now: float,
+                              causes: Set[str]) -> None:
+        """Refresh the observations which are similar to a detection and add the other detections as new observations.
+
+        A detection which is similar to an earlier new detection of the same image is not added either.
+        """
+        categories = np.array([self._category_code(d.category_name) for d in detections], dtype=np.int64)
+        matches = similar(coordinates, categories, observations.coordinates, observations.categories)
+        observations.last_seen[matches.any(axis=0)] = now
+        candidates = np.flatnonzero(~matches.any(axis=1))
+        if not len(candidates):
+            return
+        among_new = similar(coordinates[candidates], categories[candidates],
+                            coordinates[candidates], categories[candidates])
+        added: List[int] = []
+        for i, index in enumerate(candidates):
+            if among_new[i, added].any():
+                continue
+            added.append(i)
+            if self._is_uncertain(detections[index].confidence):
+                causes.add('uncertain')
+        observations.add(coordinates[candidates[added]], categories[candidates[added]], now)
+        self._next_expiry = min(self._next_expiry, now + self.reset_time)
+
+    def _similar_boxes(self, new: np.ndarray, new_categories: np.ndarray,
+                       old: np.ndarray, old_categories: np.ndarray) -> np.ndarray:
+        """Return a (new x old) matrix which is True where the boxes have the same category and a high IoU."""
+        x_a = np.maximum(new[:, None, 0], old[None, :, 0])
+        y_a = np.maximum(new[:, None, 1], old[None, :, 1])
+        x_b = np.minimum(new[:, None, 0] + new[:, None, 2], old[None, :, 0] + old[None, :, 2])
+        y_b = np.minimum(new[:, None, 1] + new[:, None, 3], old[None, :, 1] + old[None, :, 3])
+        intersection = np.maximum(x_b - x_a, 0) * np.maximum(y_b - y_a, 0)
+        union = (new[:, None, 2] * new[:, None, 3]) + (old[None, :, 2] * old[None, :, 3]) - intersection
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = np.where(union > 0, intersection / union, 0)
+        return (new_categories[:, None] == old_categories[None, :]) & (iou >= self.iou_threshold)
+
+    def _similar_points(self, new: np.ndarray, new_categories: np.ndarray,
+                        old: np.ndarray, old_categories: np.ndarray) -> np.ndarray:
+        """Return a (new x old) matrix which is True where the points have the same category and are close."""
+        distance = np.sqrt(((new[:, None, :] - old[None, :, :]) ** 2).sum(axis=2))
+        return (new_categories[:, None] == old_categories[None, :]) & (distance < self.max_point_distance)
+
+    def _category_code(self, category_name: str) -> int:
+        return self._category_codes.setdefault(category_name, len(self._category_codes))
+
+    def _is_uncertain(self, confidence: float) -> bool:
+        return self.min_uncertain_threshold <= confidence <= self.max_uncertain_threshold
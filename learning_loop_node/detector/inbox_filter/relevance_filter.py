@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 
@@ -17,19 +17,20 @@ class RelevanceFilter():
     async def may_upload_detections(self,
                                     image_metadata: ImageMetadata,
                                     cam_id: Optional[str],
-                                    image: np.ndarray) -> List[str]:
+                                    image: Union[np.ndarray, bytes]) -> List[str]:
         """Check if the detection should be uploaded to the outbox.
         If so, upload it and return the list of causes for the upload.
+        Encoded images (bytes) are passed to the outbox as they are.
+        Only the history of the given camera forgets its old observations, so the cost does not grow
+        with the number of cameras.
         """
-        for group in self.cam_histories.values():
-            group.forget_old_detections()
-
         if cam_id is None:
             history = self.unknown_cam_history
         else:
             if cam_id not in self.cam_histories:
                 self.cam_histories[cam_id] = CamObservationHistory()
             history = self.cam_histories[cam_id]
+        history.forget_old_detections()
 
         causes = history.get_causes_to_upload(image_metadata)
         if len(image_metadata) >= 80:
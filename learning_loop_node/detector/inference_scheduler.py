@@ -0,0 +1,294 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from ..enums import DetectionPriority
+from .exceptions import DetectorOverloadedError, FrameSupersededError
+
+R = TypeVar('R')
+"""result of evaluating one image (e.g. ImageMetadata)"""
+
+BatchEvaluator = Callable[[List[np.ndarray], int], Awaitable[List[R]]]
+"""Evaluates a list of images on the given detector slot."""
+
+
+@dataclass(eq=False)
+class _Job:
+    images: List[np.ndarray]
+    future: 'asyncio.Future[List[Any]]'
+    priority: DetectionPriority = DetectionPriority.Interactive
+    key: Optional[str] = None
+    camera_id: Optional[str] = None
+    latest_frame_only: bool = False
+    waiting: bool = True
+    """False once the job was taken by a worker or removed from the queue"""
+
+
+class _FairQueue:
+    """Start-time fair queue of the jobs of one priority class.
+
+    Every job gets a start tag of max(virtual time, finish tag of the previous job with the same key);
+    jobs are dispatched in the order of their start tags. The finish tag adds the number of images of the job,
+    so a key sending large batches has to wait correspondingly longer before its next job is dispatched.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, _Job]] = []
+        self._counter = itertools.count()
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[Optional[str], float] = {}
+
+    def push(self, job: _Job) -> None:
+        start_tag = max(self._virtual_time, self._finish_tags.get(job.key, 0.0))
+        self._finish_tags[job.key] = start_tag + len(job.images)
+        heapq.heappush(self._heap, (start_tag, next(self._counter), job))
+
+    def replace(self, old: _Job, new: _Job) -> None:
+        """Put `new` at the position of the waiting job `old`."""
+        for start_tag, _, job in self._heap:
+            if job is old:
+                heapq.heappush(self._heap, (start_tag, next(self._counter), new))
+                return
+        raise ValueError('job is not in the queue')
+
+    def peek(self) -> Optional[_Job]:
+        while self._heap and not self._heap[0][2].waiting:
+            heapq.heappop(self._heap)  # lazily drop jobs which were removed while waiting
+        if not self._heap:
+            self._finish_tags.clear()  # all keys are idle
+            return None
+        return self._heap[0][2]
+
+    def pop(self) -> _Job:
+        start_tag, _, job = heapq.heappop(self._heap)
+        self._virtual_time = start_tag
+        return job
+
+
+class InferenceScheduler(Generic[R]):
+    """Collects concurrent detection requests and evaluates them together.
+
+    A worker takes the next waiting request and then keeps collecting further single-image requests
+    until either `max_batch_size` images are gathered or `batch_window_s` has passed.
+    The collected images are passed to `evaluate_batch` in one call and each caller
+    receives its own result (e.g. ImageMetadata). With `max_batch_size=1` every request is evaluated on its own.
+    Batch requests (`submit_batch`) are evaluated in one call and never combined with other requests.
+
+    There is one worker per detector slot (`num_slots`). A worker only takes new requests
+    from the shared queue when its slot is free, so requests go to whichever slot becomes available first.
+
+    Scheduling: waiting requests of a higher DetectionPriority are always dispatched first.
+    Within a priority class the requests of different keys (e.g. camera ids or SocketIO clients) are interleaved
+    by weighted fair queuing, where the weight of a request is its number of images.
+
+    Admission control: if `max_queue_depth` requests are already waiting, or a request waited longer than
+    `max_wait_s` without being picked up by a worker, a DetectorOverloadedError is raised (0 disables the limit).
+
+    Latest-frame-only requests replace a waiting latest-frame-only request of the same camera_id
+    (taking over its position in the queue); the replaced caller receives a FrameSupersededError.
+    """
+
+    def __init__(self, evaluate_batch: BatchEvaluator[R], *,
+                 num_slots: int = 1, max_batch_size: int = 1, batch_window_s: float = 0.0,
+                 max_queue_depth: int = 0, max_wait_s: float = 0.0) -> None:
+        self.log = logging.getLogger('InferenceScheduler')
+        self._evaluate_batch = evaluate_batch
+        self.num_slots = max(1, num_slots)
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window_s = max(0.0, batch_window_s)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.max_wait_s = max(0.0, max_wait_s)
+        self._queues = {priority: _FairQueue() for priority in DetectionPriority}  # in order of precedence
+        self._waiting_jobs = 0
+        self._waiting_images = 0
+        self._latest_frames: Dict[str, _Job] = {}
+        """waiting latest-frame-only jobs by camera_id"""
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._avg_batch_duration_s = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a free detector slot."""
+        return self._waiting_jobs
+
+    async def submit(self, image: np.ndarray, *,
+                     priority: DetectionPriority = DetectionPriority.Interactive,
+                     key: Optional[str] = None,
+                     camera_id: Optional[str] = None, latest_frame_only: bool = False) -> R:
+        """Enqueue a single image and wait for its detections.
+
+        :param key: requests with the same key share their fair share of the detector (defaults to camera_id)
+        :raises DetectorOverloadedError: if the request is rejected by the admission control
+        :raises FrameSupersededError: if a newer frame of the same camera replaced this request (latest-frame-only mode)
+        """
+        job = _Job([image], asyncio.get_running_loop().create_future(), priority,
+                   key=key or camera_id, camera_id=camera_id, latest_frame_only=latest_frame_only and camera_id is not None)
+        return (await self._run_job(job))[0]
+
+    async def submit_batch(self, images: List[np.ndarray], *,
+                           priority: DetectionPriority = DetectionPriority.Bulk,
+                           key: Optional[str] = None) -> List[R]:
+        """Enqueue a batch of images which is evaluated in one call and wait for the detections.
+
+        :raises DetectorOverloadedError: if the request is rejected by the admission control
+        """
+        if not images:
+            return []
+        job = _Job(list(images), asyncio.get_running_loop().create_future(), priority, key=key)
+        return await self._run_job(job)
+
+    async def shutdown(self) -> None:
+        """Stop the workers and fail all requests which are still waiting."""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        for queue in self._queues.values():
+            while (job := queue.peek()) is not None:
+                self._take(queue)
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError('inference scheduler was shut down'))
+
+    async def _run_job(self, job: _Job) -> List[R]:
+        self._ensure_workers()
+        assert self._wakeup is not None
+        if not self._replace_older_frame(job):
+            if self.max_queue_depth and self._waiting_jobs >= self.max_queue_depth:
+                raise DetectorOverloadedError(f'inference queue is full ({self._waiting_jobs} waiting)',
+                                              self._estimate_retry_after_s())
+            self._queues[job.priority].push(job)
+            self._add(job)
+        self._wakeup.set()
+        try:
+            if self.max_wait_s:
+                await asyncio.wait([job.future], timeout=self.max_wait_s)
+                if job.waiting:
+                    raise DetectorOverloadedError(f'request was not scheduled within {self.max_wait_s} s',
+                                                  self._estimate_retry_after_s())
+            return await job.future
+        finally:
+            if job.waiting:  # rejected or cancelled by the caller while waiting
+                self._remove(job)
+                job.future.cancel()
+
+    def _replace_older_frame(self, job: _Job) -> bool:
+        if not job.latest_frame_only:
+            return False
+        assert job.camera_id is not None
+        waiting = self._latest_frames.get(job.camera_id)
+        if waiting is None or waiting.priority != job.priority:
+            return False
+        self._queues[job.priority].replace(waiting, job)
+        self._remove(waiting)
+        self._add(job)
+        if not waiting.future.done():
+            waiting.future.set_exception(FrameSupersededError(f'superseded by a newer frame of {job.camera_id}'))
+        return True
+
+    def _add(self, job: _Job) -> None:
+        self._waiting_jobs += 1
+        self._waiting_images += len(job.images)
+        if job.latest_frame_only:
+            assert job.camera_id is not None
+            self._latest_frames[job.camera_id] = job
+
+    def _remove(self, job: _Job) -> None:
+        job.waiting = False  # the queue drops it lazily
+        self._waiting_jobs -= 1
+        self._waiting_images -= len(job.images)
+        if job.camera_id is not None and self._latest_frames.get(job.camera_id) is job:
+            del self._latest_frames[job.camera_id]
+
+    def _take(self, queue: _FairQueue) -> _Job:
+        job = queue.pop()
+        self._remove(job)
+        return job
+
+    def _ensure_workers(self) -> None:
+        if self._workers and not any(worker.done() for worker in self._workers):
+            return
+        for worker in self._workers:
+            worker.cancel()
+        self._wakeup = asyncio.Event()  # new workers may run on a different event loop (e.g. after a fork)
+        self._workers = [asyncio.create_task(self._run(slot), name=f'inference scheduler slot {slot}')
+                         for slot in range(self.num_slots)]
+
+    def _estimate_retry_after_s(self) -> int:
+        batches_ahead = self._waiting_images / (self.num_slots * self.max_batch_size)
+        return max(1, math.ceil(batches_ahead * self._avg_batch_duration_s))
+
+    async def _run(self, slot: int) -> None:
+        while True:
+            batch = await self._collect_batch()
+            await self._process(batch, slot)
+
+    def _next_queue(self) -> Optional[_FairQueue]:
+        """Return the queue of the highest priority class with waiting jobs."""
+        return next((queue for queue in self._queues.values() if queue.peek() is not None), None)
+
+    async def _next_job(self) -> _Job:
+        assert self._wakeup is not None
+        while (queue := self._next_queue()) is None:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._take(queue)
+
+    async def _collect_batch(self) -> List[_Job]:
+        batch = [await self._next_job()]
+        if len(batch[0].images) > 1:
+            return batch
+        deadline = asyncio.get_running_loop().time() + self.batch_window_s
+        while len(batch) < self.max_batch_size:
+            queue = self._next_queue()
+            if queue is not None:
+                job = queue.peek()
+                assert job is not None
+                if len(job.images) > 1:
+                    break  # batch requests are evaluated on their own
+                batch.append(self._take(queue))
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                assert self._wakeup is not None
+                self._wakeup.clear()
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _process(self, batch: List[_Job], slot: int) -> None:
+        batch = [job for job in batch if not job.future.done()]  # e.g. cancelled by the caller
+        if not batch:
+            return
+        images = [image for job in batch for image in job.images]
+        start = asyncio.get_running_loop().time()
+        try:
+            results = await self._evaluate_batch(images, slot)
+            if len(results) != len(images):
+                raise RuntimeError(f'expected {len(images)} results from batch evaluation, got {len(results)}')
+        except Exception as e:
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        duration = asyncio.get_running_loop().time() - start
+        self._avg_batch_duration_s = 0.8 * self._avg_batch_duration_s + 0.2 * duration
+        self.log.debug('evaluated batch of %d images on slot %d in %.3f s', len(images), slot, duration)
+        offset = 0
+        for job in batch:
+            if not job.future.done():
+                job.future.set_result(results[offset:offset + len(job.images)])
+            offset += len(job.images)
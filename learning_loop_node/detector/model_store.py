@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+
+from ..data_classes import ModelInformation
+from ..globals import GLOBALS
+from .compiled_artifacts import CompiledArtifactCache
+
+INDEX_FILE = 'store.json'
+
+
+@dataclass
+class ModelStoreEntry:
+    version: str
+    size: int
+    """bytes on disk"""
+    last_used: float
+    """unix timestamp of the last download or activation"""
+    build_succeeded: Optional[bool] = None
+    """whether the detector could be built from this model (None if it was not built yet)"""
+
+
+class ModelStore:
+    """Downloaded models in `GLOBALS.data_folder/models/<version>` with a byte budget.
+
+    Metadata about the entries is kept in `models/store.json`; folders without metadata
+    (e.g. from older node versions) are added with their modification time as last use.
+    If the models exceed `max_bytes`, the least recently used ones are deleted.
+    A `max_bytes` of 0 disables the eviction.
+    Deleting a model also deletes its compiled artifacts (see CompiledArtifactCache).
+    """
+
+    def __init__(self, max_bytes: int = 0) -> None:
+        self.log = logging.getLogger('ModelStore')
+        self.max_bytes = max(0, max_bytes)
+
+    @property
+    def root(self) -> str:
+        return os.path.join(GLOBALS.data_folder, 'models')
+
+    def folder(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def contains(self, version: str) -> bool:
+        folder = self.folder(version)
+        return os.path.isdir(folder) and len(os.listdir(folder)) > 0
+
+    def model_info(self, version: str) -> Optional[ModelInformation]:
+        """Return the ModelInformation of a stored model (None if it is not stored)."""
+        if not self.contains(version):
+            return None
+        return ModelInformation.load_from_disk(self.folder(version))
+
+    def entries(self) -> Dict[str, ModelStoreEntry]:
+        """Return the metadata of all stored models by version."""
+        index = self._load_index()
+        entries: Dict[str, ModelStoreEntry] = {}
+        for version in self._stored_versions():
+            entry = index.get(version)
+            if entry is None:
+                folder = self.folder(version)
+                entry = ModelStoreEntry(version=version, size=_folder_size(folder), last_used=os.path.getmtime(folder))
+            entries[version] = entry
+        return entries
+
+    def touch(self, version: str, *, build_succeeded: Optional[bool] = None) -> None:
+        """Record the use of the model (and the result of building a detector from it)."""
+        if not self.contains(version):
+            return
+        entries = self.entries()
+        entry = entries[version]
+        entry.last_used = time.time()
+        entry.size = _folder_size(self.folder(version))
+        if build_succeeded is not None:
+            entry.build_succeeded = build_succeeded
+        self._save_index(entries)
+
+    def remove(self, version: str) -> None:
+        self._delete(version)
+        self._save_index(self.entries())
+
+    def evict(self, keep: Iterable[Optional[str]]) -> List[str]:
+        """Delete the least recently used models until the budget is met. The versions in `keep` are never deleted.
+
+        :return: the deleted versions
+        """
+        if not self.max_bytes:
+            return []
+        keep = set(keep)
+        entries = self.entries()
+        total = sum(entry.size for entry in entries.values())
+        evicted: List[str] = []
+        for entry in sorted(entries.values(), key=lambda e: e.last_used):
+            if total <= self.max_bytes:
+                break
+            if entry.version in keep:
+                continue
+            self.log.info('Deleting model %s (%d bytes) to stay within %d bytes', entry.version, entry.size,
+                          self.max_bytes)
+            self._delete(entry.version)
+            total -= entry.size
+            del entries[entry.version]
+            evicted.append(entry.version)
+        if evicted:
+            self._save_index(entries)
+        if total > self.max_bytes:
+            self.log.warning('Models use %d bytes which exceeds the budget of %d bytes', total, self.max_bytes)
+        return evicted
+
+    def _delete(self, version: str) -> None:
+        model_info = self.model_info(version)
+        if model_info is not None:
+            CompiledArtifactCache.remove_model(model_info.id)
+        shutil.rmtree(self.folder(version), ignore_errors=True)
+
+    def _stored_versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return [name for name in os.listdir(self.root) if name.replace('.', '').isdigit() and self.contains(name)]
+
+    def _load_index(self) -> Dict[str, ModelStoreEntry]:
+        try:
+            with open(os.path.join(self.root, INDEX_FILE)) as f:
+                return {version: ModelStoreEntry(**entry) for version, entry in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            self.log.exception('Could not read model store index; rebuilding it')
+            return {}
+
+    def _save_index(self, entries: Dict[str, ModelStoreEntry]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({version: asdict(entry) for version, entry in entries.items()}, f)
+        os.replace(f'{path}.tmp', path)
+
+
+def _folder_size(folder: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(folder) for name in names)
@@ -0,0 +1,66 @@
+import copy
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..data_classes import ImageMetadata
+
+REUSED_TAG = 'reused'
+"""tag added to detections which were taken over from a previous frame"""
+
+
+@dataclass(eq=False)
+class _Reference:
+    thumbnail: np.ndarray
+    model_version: str
+    metadata: ImageMetadata
+
+
+class MotionGate:
+    """Skips inference for frames of a camera which hardly differ from the last evaluated frame of that camera.
+
+    Frames are compared as small grayscale thumbnails. The change is the mean absolute difference
+    relative to the value range of the image dtype (0..1). If it is below `threshold`, the detections of
+    the reference frame are reused. The reference is only replaced by evaluated frames, so slow changes
+    add up until the threshold is exceeded. A `threshold` of 0 disables the gate.
+    """
+
+    def __init__(self, threshold: float = 0.0, thumbnail_size: int = 32) -> None:
+        self.threshold = max(0.0, threshold)
+        self.thumbnail_size = max(1, thumbnail_size)
+        self._references: Dict[str, _Reference] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def lookup(self, camera_id: str, thumbnail: np.ndarray, model_version: str) -> Optional[ImageMetadata]:
+        """Return a copy of the reference detections if the frame with this thumbnail did not change (or None)."""
+        reference = self._references.get(camera_id)
+        if reference is None or reference.model_version != model_version or reference.thumbnail.shape != thumbnail.shape:
+            return None
+        if np.abs(thumbnail - reference.thumbnail).mean() >= self.threshold:
+            return None
+        metadata = copy.deepcopy(reference.metadata)
+        metadata.tags.append(REUSED_TAG)
+        return metadata
+
+    def update(self, camera_id: str, thumbnail: np.ndarray, model_version: str, metadata: ImageMetadata) -> None:
+        """Make an evaluated frame the new reference of the camera."""
+        self._references[camera_id] = _Reference(thumbnail, model_version, copy.deepcopy(metadata))
+
+    def clear(self) -> None:
+        self._references.clear()
+
+    def thumbnail(self, image: np.ndarray) -> np.ndarray:
+        """Downscale the image to about `thumbnail_size` pixels per side by block averaging (values in 0..1)."""
+        height, width = image.shape[:2]
+        # subsample first so that averaging only touches a few pixels per block
+        step = max(1, min(height, width) // (4 * self.thumbnail_size))
+        sampled = image[::step, ::step]
+        block = max(1, min(sampled.shape[:2]) // self.thumbnail_size)
+        rows, cols = sampled.shape[0] // block, sampled.shape[1] // block
+        blocks = sampled[:rows * block, :cols * block].reshape(rows, block, cols, block, -1)
+        scale = np.iinfo(image.dtype).max if np.issubdtype(image.dtype, np.integer) else 1.0
+        return blocks.mean(axis=(1, 3, 4), dtype=np.float32) / scale
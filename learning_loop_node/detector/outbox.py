@@ -6,29 +6,42 @@ import os
 import shutil
 from asyncio import Task
 from collections import deque
-from dataclasses import asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from glob import glob
 from io import BufferedReader, TextIOWrapper
 from multiprocessing import Event
 from multiprocessing.synchronize import Event as SyncEvent
 from threading import Lock
-from typing import List, Optional, Tuple, TypeVar, Union
+from typing import List, Optional, Sequence, Tuple, TypeVar, Union
 
 import aiohttp
 import numpy as np
 import PIL
 import PIL.Image  # type: ignore
-from fastapi.encoders import jsonable_encoder
 
-from ..data_classes import ImageMetadata
+from ..data_classes import ImageMetadata, as_jsonable
 from ..enums import OutboxMode
 from ..globals import GLOBALS
 from ..helpers import environment_reader, run
 from ..helpers.misc import numpy_array_to_jpg_bytes
+from .pipeline import PipelineStage
 
 T = TypeVar('T')
 
+EXIF_ORIENTATION = 0x0112
+
+
+def _to_jpg_bytes(image: bytes) -> bytes:
+    """Return JPEGs without an EXIF rotation as they are; (re-)encode the raw pixels of all other images.
+
+    Inference sees the raw pixels (EXIF rotations are not applied), so the stored image must not be rotated either;
+    re-encoding drops the EXIF rotation so the detections match the image in the Learning Loop.
+    """
+    pil_image = PIL.Image.open(io.BytesIO(image))
+    if pil_image.format == 'JPEG' and pil_image.getexif().get(EXIF_ORIENTATION, 1) == 1:
+        return image
+    return numpy_array_to_jpg_bytes(np.array(pil_image))
+
 
 class Outbox():
     """
@@ -38,9 +51,10 @@ class Outbox():
     Any image can be saved to the normal or the priority queue.
     Images in the priority queue are uploaded first.
     The total queue length is limited to 1000 images.
+    Images are JPEG encoded and written to disk by a pool of `encoder_workers` threads.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, encoder_workers: int = 2) -> None:
         self.log = logging.getLogger()
         self.path = f'{GLOBALS.data_folder}/outbox'
         os.makedirs(self.path, exist_ok=True)
@@ -72,30 +86,35 @@ class Outbox():
         self.upload_folders: deque[str] = deque()
         self.folders_lock = Lock()
 
+        self.encoder = PipelineStage('outbox_encoder', workers=encoder_workers, queue_size=self.BATCH_SIZE)
+        """encodes and writes images without blocking the event loop"""
+        self._last_identifier_time = datetime.min
+
         for file in glob(f'{self.path}/priority/*'):
             self.priority_upload_folders.append(file)
         for file in glob(f'{self.path}/normal/*'):
             self.upload_folders.append(file)
 
     async def save(self,
-                   image: np.ndarray,
+                   image: Union[np.ndarray, bytes],
                    image_metadata: Optional[ImageMetadata] = None,
                    upload_priority: bool = False) -> None:
         """
         Save an image and its metadata to disk. 
 
         The data will be picked up by the continuous upload process.
+        The image is either an ndarray or the bytes of an encoded image file.
+        JPEG bytes without an EXIF rotation are written as they are; other images are (re-)encoded by the encoder pool.
+        Use `save_many` to save several images in parallel.
         """
 
-        jpg_bytes = numpy_array_to_jpg_bytes(image)
-
         if image_metadata is None:
             image_metadata = ImageMetadata()
 
-        identifier = datetime.now().isoformat(sep='_', timespec='microseconds')
+        identifier = self._new_identifier()
 
         try:
-            await run.io_bound(self._save_files_to_disk, identifier, jpg_bytes, image_metadata, upload_priority)
+            await self.encoder.run(self._encode_and_save, identifier, image, image_metadata, upload_priority)
         except Exception as e:
             self.log.error('Failed to save files for image %s: %s', identifier, e)
             return
@@ -107,6 +126,38 @@ class Outbox():
 
         await self._trim_upload_queue()
 
+    async def save_many(self,
+                        images: Sequence[Union[np.ndarray, bytes]],
+                        images_metadata: Optional[Sequence[Optional[ImageMetadata]]] = None,
+                        upload_priority: bool = False) -> None:
+        """
+        Save several images and their metadata to disk.
+
+        The images are encoded and written in parallel by the encoder pool.
+        """
+        if images_metadata is not None and len(images_metadata) != len(images):
+            raise ValueError('Number of images and number of metadata items do not match')
+        metadata = images_metadata if images_metadata is not None else [None] * len(images)
+        await asyncio.gather(*[self.save(image, image_metadata, upload_priority)
+                               for image, image_metadata in zip(images, metadata, strict=True)])
+
+    def _new_identifier(self) -> str:
+        """Return a timestamp identifier which is unique even if several images are saved in the same microsecond."""
+        now = max(datetime.now(), self._last_identifier_time + timedelta(microseconds=1))
+        self._last_identifier_time = now
+        return now.isoformat(sep='_', timespec='microseconds')
+
+    def _encode_and_save(self,
+                         identifier: str,
+                         image: Union[np.ndarray, bytes],
+                         image_metadata: ImageMetadata,
+                         upload_priority: bool) -> None:
+        if isinstance(image, bytes):
+            jpg_bytes = _to_jpg_bytes(image)
+        else:
+            jpg_bytes = numpy_array_to_jpg_bytes(image)
+        self._save_files_to_disk(identifier, jpg_bytes, image_metadata, upload_priority)
+
     def _save_files_to_disk(self,
                             identifier: str,
                             jpeg_image: bytes,
@@ -121,7 +172,7 @@ class Outbox():
         os.makedirs(tmp, exist_ok=True)
 
         with open(tmp + f'/image_{identifier}.json', 'w') as f:
-            json.dump(jsonable_encoder(asdict(image_metadata)), f)
+            json.dump(as_jsonable(image_metadata), f)
 
         with open(tmp + f'/image_{identifier}.jpg', 'wb') as f:
             f.write(jpeg_image)
@@ -291,6 +342,12 @@ class Outbox():
         self.log.info('Upload thread terminated')
         return True
 
+    async def stop(self) -> bool:
+        """Stop the continuous upload and the encoder pool; images cannot be saved afterwards."""
+        stopped = await self.ensure_continuous_upload_stopped()
+        self.encoder.shutdown()
+        return stopped
+
     def _upload_process_alive(self) -> bool:
         return bool(self.upload_task and not self.upload_task.done())
 
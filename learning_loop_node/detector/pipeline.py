@@ -0,0 +1,41 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+
+class PipelineStage:
+    """A stage of the detection pipeline which runs blocking functions on its own pool of worker threads.
+
+    At most `workers` calls run at the same time and up to `queue_size` further calls wait for a free worker.
+    Callers beyond that wait before they are queued, so a slow stage throttles the stages in front of it
+    instead of buffering an unlimited number of images.
+    The event loop stays responsive because the functions never run on it.
+    """
+
+    def __init__(self, name: str, *, workers: int = 1, queue_size: int = 32) -> None:
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f'{name}_stage')
+        self._admission = asyncio.Semaphore(self.workers + self.queue_size)
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls which are running or waiting for a worker."""
+        return self._pending
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        async with self._admission:
+            self._pending += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, functools.partial(func, *args, **kwargs))
+            finally:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,251 @@
+"""Out-of-process inference backend.
+
+The DetectorLogic is built and evaluated in a separate worker process so CPU-bound
+`evaluate` implementations are not limited by the GIL of the node process.
+Frames are written into a shared memory buffer and only their offsets, shapes and dtypes are
+sent to the worker, which wraps the buffer as ndarray without copying or pickling the image data.
+"""
+import asyncio
+import logging
+import multiprocessing
+import pickle
+import threading
+import weakref
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from ..data_classes import ImageMetadata, ImagesMetadata, ModelInformation
+from .detector_logic import AnyDetectorLogicFactory, DetectorLogic, build_detector_logic
+from .exceptions import InferenceWorkerError
+
+_Frame = Tuple[int, Tuple[int, ...], str]
+"""offset in the shared buffer, shape and dtype of an image"""
+
+
+class ProcessDetectorLogicFactory:
+    """Wraps a (compiling) DetectorLogicFactory so that every built DetectorLogic runs in its own worker process.
+
+    The wrapped factory must be picklable if the 'spawn' start method is used.
+    Combine with DETECTOR_REPLICAS to run multiple worker processes in parallel.
+    """
+
+    def __init__(self, factory: AnyDetectorLogicFactory, *,
+                 start_method: str = 'spawn',
+                 timeout_s: float = 60.0,
+                 startup_timeout_s: float = 600.0,
+                 buffer_size: int = 32 * 1024 * 1024) -> None:
+        self.factory = factory
+        self.start_method = start_method
+        self.timeout_s = timeout_s
+        self.startup_timeout_s = startup_timeout_s
+        self.buffer_size = buffer_size
+
+    @property
+    def model_format(self) -> str:
+        return self.factory.model_format
+
+    async def build(self, model_info: ModelInformation) -> 'ProcessDetectorLogic':
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: ProcessDetectorLogic(self, model_info))
+
+
+class ProcessDetectorLogic(DetectorLogic):
+    """Proxy for a DetectorLogic which lives in a worker process.
+
+    If the worker crashes or does not answer within `timeout_s`, it is killed,
+    the current request fails with an InferenceWorkerError and a new worker is started in the background.
+    Exceptions raised by the wrapped DetectorLogic are re-raised with their original type if they can be pickled.
+    The background restart does not reference the proxy, so the proxy can be released while a restart is running
+    (the restarted worker is stopped then).
+    """
+
+    def __init__(self, config: ProcessDetectorLogicFactory, model_info: ModelInformation) -> None:
+        self.log = logging.getLogger('ProcessDetectorLogic')
+        self._config = config
+        self._model_info = model_info
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._workers: List[_Worker] = [_start_worker(config, model_info)]
+        """holds the current worker (if any); shared with the finalizer which stops it"""
+        weakref.finalize(self, _stop_workers, self._workers, self._lock, self._closed)
+
+    def evaluate(self, image: np.ndarray) -> ImageMetadata:
+        return self._call('evaluate', [image])
+
+    def batch_evaluate(self, images: List[np.ndarray]) -> ImagesMetadata:
+        return self._call('batch_evaluate', images)
+
+    def _call(self, method: str, images: List[np.ndarray]) -> Any:
+        with self._lock:
+            if not self._workers:
+                self._workers.append(_start_worker(self._config, self._model_info))
+            worker = self._workers[0]
+            try:
+                return worker.call(method, images, self._config.timeout_s)
+            except InferenceWorkerError:
+                self.log.exception('Inference worker (pid %s) failed; restarting it', worker.process.pid)
+                self._workers.clear()
+                worker.stop()
+                threading.Thread(target=_restart_worker,
+                                 args=(self._config, self._model_info, self._workers, self._lock, self._closed),
+                                 name='restart inference worker', daemon=True).start()
+                raise
+
+
+def _start_worker(config: ProcessDetectorLogicFactory, model_info: ModelInformation) -> '_Worker':
+    return _Worker(multiprocessing.get_context(config.start_method), config.factory, model_info,
+                   config.buffer_size, config.startup_timeout_s)
+
+
+def _restart_worker(config: ProcessDetectorLogicFactory, model_info: ModelInformation,
+                    workers: List['_Worker'], lock: threading.Lock, closed: threading.Event) -> None:
+    """Start a new worker in the background (unless a request already started one or the proxy was released)."""
+    log = logging.getLogger('ProcessDetectorLogic')
+    with lock:
+        if workers or closed.is_set():
+            return
+    try:
+        worker = _start_worker(config, model_info)
+    except Exception:
+        log.exception('Could not restart inference worker; will retry on next request')
+        return
+    with lock:
+        if workers or closed.is_set():
+            worker.stop()
+            return
+        workers.append(worker)
+    log.info('Restarted inference worker for model %s', model_info.version)
+
+
+class _Worker:
+    """A worker process together with the shared memory buffer used to pass frames to it.
+
+    There is a single buffer (grown on demand) instead of a ring of slots because calls are serialized:
+    the node evaluates at most one request per detector replica at a time (see InferenceScheduler),
+    so copying a next frame while the worker reads the current one would never happen.
+    Use DETECTOR_REPLICAS to overlap frame transfer and inference of different requests.
+    """
+
+    def __init__(self, ctx: Any, factory: AnyDetectorLogicFactory, model_info: ModelInformation,
+                 buffer_size: int, startup_timeout_s: float) -> None:
+        self.buffer = SharedMemory(create=True, size=buffer_size)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(factory, model_info, child_conn, self.buffer.name),
+                                   name=f'inference worker {model_info.version}', daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            self._receive(startup_timeout_s)
+        except BaseException:
+            self.stop()
+            raise
+
+    def call(self, method: str, images: List[np.ndarray], timeout_s: float) -> Any:
+        try:
+            self.conn.send((method, self._write_frames(images)))
+        except (OSError, ValueError) as e:
+            raise InferenceWorkerError(f'could not send frames to inference worker: {e}') from e
+        return self._receive(timeout_s)
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(('stop', None))
+        except Exception:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.buffer.close()
+        self.buffer.unlink()
+
+    def _write_frames(self, images: List[np.ndarray]) -> List[_Frame]:
+        required = sum(image.nbytes for image in images)
+        if required > self.buffer.size:
+            self._grow_buffer(max(required, 2 * self.buffer.size))
+        frames: List[_Frame] = []
+        offset = 0
+        for image in images:
+            target = np.ndarray(image.shape, dtype=image.dtype, buffer=self.buffer.buf, offset=offset)
+            np.copyto(target, image)
+            del target  # the buffer can only be closed if no views exist
+            frames.append((offset, image.shape, image.dtype.str))
+            offset += image.nbytes
+        return frames
+
+    def _grow_buffer(self, size: int) -> None:
+        new_buffer = SharedMemory(create=True, size=size)
+        self.conn.send(('buffer', new_buffer.name))
+        self.buffer.close()
+        self.buffer.unlink()  # the worker keeps its mapping until it switched to the new buffer
+        self.buffer = new_buffer
+
+    def _receive(self, timeout_s: float) -> Any:
+        try:
+            if not self.conn.poll(timeout_s):
+                raise InferenceWorkerError(f'inference worker did not respond within {timeout_s} s')
+            status, payload = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(timeout=1)
+            raise InferenceWorkerError(f'inference worker died (exit code {self.process.exitcode})') from e
+        if status == 'error':
+            raise payload
+        return payload
+
+
+def _stop_workers(workers: List[_Worker], lock: threading.Lock, closed: threading.Event) -> None:
+    closed.set()
+    with lock:
+        for worker in workers:
+            worker.stop()
+        workers.clear()
+
+
+def _worker_main(factory: AnyDetectorLogicFactory, model_info: ModelInformation,
+                 conn: Connection, buffer_name: str) -> None:
+    try:
+        logic = asyncio.run(build_detector_logic(factory, model_info))
+    except Exception as e:
+        conn.send(('error', _picklable(e)))
+        return
+    conn.send(('ok', None))
+
+    buffer = SharedMemory(name=buffer_name)
+    while True:
+        try:
+            method, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if method == 'stop':
+            break
+        if method == 'buffer':
+            buffer.close()
+            buffer = SharedMemory(name=payload)
+            continue
+
+        images = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer.buf, offset=offset)
+                  for offset, shape, dtype in payload]
+        try:
+            if method == 'evaluate':
+                result: Any = logic.evaluate(images[0])
+            else:
+                result = logic.batch_evaluate(images)
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', _picklable(e)))
+        finally:
+            del images
+    buffer.close()
+
+
+def _picklable(e: Exception) -> Exception:
+    """Return the exception itself if it survives pickling, otherwise a RuntimeError describing it."""
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(f'{type(e).__name__}: {e}')
+
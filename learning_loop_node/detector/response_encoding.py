@@ -0,0 +1,131 @@
+"""Compact encodings of detection responses.
+
+Besides the default JSON, detections can be returned as
+
+- 'msgpack': the JSON structure encoded with MessagePack (requires the optional `msgpack` package)
+- 'columnar': per detection type, coordinates, confidences and category indices are packed
+  little-endian arrays (bytes) instead of one object per detection:
+
+      {'categories': [[name, id], ...], 'model_names': [...], 'tags': [...], 'source': ..., 'created': ...,
+       'box_detections': {'category': <u2>, 'model': <u2>, 'confidence': <f4>, 'xywh': <i4 (n, 4)>},
+       'point_detections': {'category': <u2>, 'model': <u2>, 'confidence': <f4>, 'xy': <f4 (n, 2)>},
+       'segmentation_detections': {'category': <u2>, 'model': <u2>, 'confidence': <f4>,
+                                   'offsets': <i4 (n + 1)>, 'xy': <i4 (m, 2)>},
+       'classification_detections': {'category': <u2>, 'model': <u2>, 'confidence': <f4>}}
+
+  'category' and 'model' index into 'categories' and 'model_names'; the points of segmentation i
+  are xy[offsets[i]:offsets[i + 1]]. Via REST the columnar layout is encoded with MessagePack,
+  via SocketIO it is sent as is (bytes are transferred as binary attachments).
+  Annotations are not part of the columnar layout.
+"""
+import json
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..data_classes import ImageMetadata, ImagesMetadata, Shape, as_jsonable
+from .exceptions import UnsupportedResponseFormatError
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ResponseFormat = Literal['json', 'msgpack', 'columnar']
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+COLUMNAR_MEDIA_TYPE = 'application/vnd.learning-loop.columnar+msgpack'
+MEDIA_TYPES: Dict[ResponseFormat, str] = {
+    'json': 'application/json',
+    'msgpack': MSGPACK_MEDIA_TYPE,
+    'columnar': COLUMNAR_MEDIA_TYPE,
+}
+
+
+def response_format_from_accept(accept: Optional[str]) -> ResponseFormat:
+    """Return the format of the first supported media type in an HTTP Accept header (JSON if none matches)."""
+    for media_range in (accept or '').split(','):
+        media_type = media_range.split(';')[0].strip().lower()
+        for response_format, candidate in MEDIA_TYPES.items():
+            if media_type == candidate:
+                return response_format
+    return 'json'
+
+
+def check_response_format(response_format: str, *, binary: bool = False) -> ResponseFormat:
+    """Validate the format requested by a client before any work is done for the request.
+
+    :param binary: whether the response is encoded as bytes (REST), see `encode_detections`
+    :raises UnsupportedResponseFormatError: if the format is unknown or requires msgpack which is not installed
+    """
+    if response_format not in MEDIA_TYPES:
+        raise UnsupportedResponseFormatError(f'unknown response format {response_format!r}')
+    if (response_format == 'msgpack' or (binary and response_format == 'columnar')) and msgpack is None:
+        raise UnsupportedResponseFormatError(f'response format {response_format} requires the msgpack package')
+    return response_format  # type: ignore
+
+
+def encode_detections(metadata: Union[ImageMetadata, ImagesMetadata], response_format: ResponseFormat, *,
+                      binary: bool = False) -> Any:
+    """Encode detections for a response.
+
+    With `binary` (REST) the result is always bytes, otherwise (SocketIO) JSON and columnar results are dicts.
+    Encoding many detections is CPU-bound; the detector node runs it in its postprocess pipeline stage.
+    :raises UnsupportedResponseFormatError: if a binary encoding is requested and msgpack is not installed
+    """
+    if response_format == 'columnar':
+        encoded: Any = columnar_detections(metadata)
+    else:
+        encoded = as_jsonable(metadata)
+    if response_format == 'msgpack' or (binary and response_format == 'columnar'):
+        if msgpack is None:
+            raise UnsupportedResponseFormatError(f'response format {response_format} requires the msgpack package')
+        return msgpack.packb(encoded)
+    if binary:
+        return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+    return encoded
+
+
+def columnar_detections(metadata: Union[ImageMetadata, ImagesMetadata]) -> Dict[str, Any]:
+    if isinstance(metadata, ImagesMetadata):
+        return {'items': [columnar_detections(item) for item in metadata.items]}
+
+    categories: Dict[Tuple[str, Optional[str]], int] = {}
+    model_names: Dict[str, int] = {}
+
+    def columns(detections: Sequence[Any]) -> Dict[str, bytes]:
+        return {
+            'category': np.array([categories.setdefault((d.category_name, d.category_id), len(categories))
+                                  for d in detections], dtype='<u2').tobytes(),
+            'model': np.array([model_names.setdefault(d.model_name, len(model_names))
+                               for d in detections], dtype='<u2').tobytes(),
+            'confidence': np.array([d.confidence for d in detections], dtype='<f4').tobytes(),
+        }
+
+    boxes = metadata.box_detections
+    points = metadata.point_detections
+    segmentations = metadata.segmentation_detections
+    shapes = [_shape_points(s.shape) for s in segmentations]
+    result = {
+        'box_detections': {**columns(boxes),
+                           'xywh': np.array([(b.x, b.y, b.width, b.height) for b in boxes], dtype='<i4').tobytes()},
+        'point_detections': {**columns(points),
+                             'xy': np.array([(p.x, p.y) for p in points], dtype='<f4').tobytes()},
+        'segmentation_detections': {**columns(segmentations),
+                                    'offsets': np.cumsum([0] + [len(s) // 2 for s in shapes], dtype='<i4').tobytes(),
+                                    'xy': np.array([v for s in shapes for v in s], dtype='<i4').tobytes()},
+        'classification_detections': columns(metadata.classification_detections),
+        'tags': metadata.tags,
+        'source': metadata.source,
+        'created': metadata.created,
+    }
+    result['categories'] = [list(category) for category in categories]
+    result['model_names'] = list(model_names)
+    return result
+
+
+def _shape_points(shape: Union[Shape, str]) -> List[int]:
+    """Return the flat x, y values of a segmentation shape (which may already be a comma separated string)."""
+    if isinstance(shape, Shape):
+        return [v for p in shape.points for v in (p.x, p.y)]
+    return [round(float(v)) for v in shape.split(',') if v]
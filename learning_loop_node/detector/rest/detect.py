@@ -1,10 +1,13 @@
 import logging
-from typing import TYPE_CHECKING, Literal, Optional
+from typing import TYPE_CHECKING, Literal, Optional, Union
 
-from fastapi import APIRouter, File, Header, Request, UploadFile
+import numpy as np
+from fastapi import APIRouter, File, Header, HTTPException, Request, Response, UploadFile
 
 from ...data_classes.image_metadata import ImageMetadata
-from ...helpers.misc import jpg_bytes_to_numpy_array
+from ...enums import DetectionPriority
+from ..exceptions import DetectorOverloadedError, FrameSupersededError, UnsupportedResponseFormatError
+from ..response_encoding import MEDIA_TYPES, check_response_format, encode_detections, response_format_from_accept
 
 if TYPE_CHECKING:
     from ..detector_node import DetectorNode
@@ -21,7 +24,10 @@ async def http_detect(
     source: Optional[str] = Header(None, description='The source of the image (used by learning loop)'),
     autoupload: Optional[Literal['filtered', 'all', 'disabled']] = Header(None, description='Mode to decide whether to upload the image to the learning loop',
                                                                           examples=['filtered', 'all', 'disabled']),
-    creation_date: Optional[str] = Header(None, description='The creation date of the image (used by learning loop)')
+    creation_date: Optional[str] = Header(None, description='The creation date of the image (used by learning loop)'),
+    latest_frame_only: bool = Header(False, description='A newer frame of the same camera replaces this one while it is waiting for inference'),
+    priority: DetectionPriority = Header(DetectionPriority.Interactive, description='Scheduling priority of the request',
+                                         examples=['interactive', 'bulk', 'background'])
 ):
     """
     Single image example:
@@ -31,9 +37,10 @@ async def http_detect(
     Multiple images example:
 
         for i in `seq 1 10`; do time curl --request POST -F 'file=@test.jpg' localhost:8004/detect; done
-    """
-    node: 'DetectorNode' = request.app
 
+    The response is JSON unless a compact encoding is requested via the Accept header
+    ('application/msgpack' or 'application/vnd.learning-loop.columnar+msgpack').
+    """
     try:
         # Read file directly to bytes instead of using numpy
         file_bytes = await file.read()
@@ -41,14 +48,71 @@ async def http_detect(
         logging.exception('Error during reading of image %s.', file.filename)
         raise Exception(f'Uploaded file {file.filename} is no image file.') from exc
 
+    return await _detect(request, file_bytes, file.filename,
+                         camera_id=camera_id, tags=tags, source=source, autoupload=autoupload,
+                         creation_date=creation_date, latest_frame_only=latest_frame_only, priority=priority)
+
+
+@router.post("/detect/raw", response_model=ImageMetadata)
+async def http_detect_raw(
+    request: Request,
+    shape: str = Header(..., description='Shape of the ndarray as comma separated ints', examples=['480,640,3']),
+    dtype: str = Header('uint8', description='Data type of the ndarray', examples=['uint8', 'float32']),
+    camera_id: Optional[str] = Header(None, description='The camera id (used by learning loop)'),
+    tags: Optional[str] = Header(None, description='Tags to add to the image (used by learning loop)'),
+    source: Optional[str] = Header(None, description='The source of the image (used by learning loop)'),
+    autoupload: Optional[Literal['filtered', 'all', 'disabled']] = Header(None, description='Mode to decide whether to upload the image to the learning loop',
+                                                                          examples=['filtered', 'all', 'disabled']),
+    creation_date: Optional[str] = Header(None, description='The creation date of the image (used by learning loop)'),
+    latest_frame_only: bool = Header(False, description='A newer frame of the same camera replaces this one while it is waiting for inference'),
+    priority: DetectionPriority = Header(DetectionPriority.Interactive, description='Scheduling priority of the request',
+                                         examples=['interactive', 'bulk', 'background'])
+):
+    """
+    Detect objects in an already decoded image sent as raw `application/octet-stream` body
+    (the bytes of the ndarray in C order, e.g. from `ndarray.tobytes()`).
+
+    Example:
+
+        curl --request POST --data-binary @frame.raw localhost:8004/detect/raw -H 'Content-Type: application/octet-stream' -H 'shape: 480,640,3' -H 'dtype: uint8'
+    """
+    body = await request.body()
+    try:
+        image = np.frombuffer(body, dtype=np.dtype(dtype)).reshape([int(s) for s in shape.split(',')], order='C')
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(400, f'body of {len(body)} bytes does not match shape {shape} and dtype {dtype}') from exc
+
+    return await _detect(request, image, 'raw image',
+                         camera_id=camera_id, tags=tags, source=source, autoupload=autoupload,
+                         creation_date=creation_date, latest_frame_only=latest_frame_only, priority=priority)
+
+
+async def _detect(request: Request, image: Union[np.ndarray, bytes], name: Optional[str], *,
+                  camera_id: Optional[str], tags: Optional[str], source: Optional[str],
+                  autoupload: Optional[Literal['filtered', 'all', 'disabled']], creation_date: Optional[str],
+                  latest_frame_only: bool, priority: DetectionPriority) -> Response:
+    node: 'DetectorNode' = request.app
+    try:
+        response_format = check_response_format(response_format_from_accept(request.headers.get('accept')),
+                                                binary=True)
+    except UnsupportedResponseFormatError as exc:
+        raise HTTPException(406, str(exc)) from exc
     try:
-        detections = await node.get_detections(image=jpg_bytes_to_numpy_array(file_bytes),
+        detections = await node.get_detections(image=image,
                                                camera_id=camera_id or None,
                                                tags=tags.split(',') if tags else [],
                                                source=source,
                                                autoupload=autoupload or 'filtered',
-                                               creation_date=creation_date)
+                                               creation_date=creation_date,
+                                               latest_frame_only=latest_frame_only,
+                                               priority=priority,
+                                               client_id=request.client.host if request.client else None)
+    except DetectorOverloadedError as exc:
+        raise HTTPException(503, 'overloaded', headers={'Retry-After': str(exc.retry_after_s)}) from exc
+    except FrameSupersededError as exc:
+        raise HTTPException(409, 'superseded') from exc
     except Exception as exc:
-        logging.exception('Error during detection of image %s.', file.filename)
-        raise Exception(f'Error during detection of image {file.filename}.') from exc
-    return detections
+        logging.exception('Error during detection of image %s.', name)
+        raise Exception(f'Error during detection of image {name}.') from exc
+    encoded = await node.postprocess_stage.run(encode_detections, detections, response_format, binary=True)
+    return Response(encoded, media_type=MEDIA_TYPES[response_format])
@@ -1,9 +1,10 @@
+import io
 from typing import TYPE_CHECKING, List, Optional
 
-from fastapi import APIRouter, File, Query, Request, UploadFile
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from PIL import Image
 
 from ...data_classes.image_metadata import ImageMetadata, ImagesMetadata
-from ...helpers.misc import jpg_bytes_to_numpy_array
 
 if TYPE_CHECKING:
     from ..detector_node import DetectorNode
@@ -11,6 +12,11 @@ if TYPE_CHECKING:
 router = APIRouter()
 
 
+def _verify_image(image_bytes: bytes) -> None:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.verify()
+
+
 @router.post("/upload")
 async def upload_image(request: Request,
                        files: List[UploadFile] = File(...),
@@ -22,6 +28,8 @@ async def upload_image(request: Request,
 
     The image source and the image creation date are optional query parameters.
     Images are automatically tagged with 'picked_by_system'.
+    JPEG files are uploaded as they are, without decoding and re-encoding them (unless they carry an EXIF rotation).
+    Files which are not valid images are rejected with status 400.
 
     Example Usage
 
@@ -30,15 +38,15 @@ async def upload_image(request: Request,
     node: 'DetectorNode' = request.app
 
     files_bytes = [await file.read() for file in files]
-    image_metadatas = []
-    images = []
-    for file_bytes in files_bytes:
-        images.append(jpg_bytes_to_numpy_array(file_bytes))
-        image_metadatas.append(ImageMetadata(source=source, created=creation_date))
-
+    for file, file_bytes in zip(files, files_bytes, strict=True):
+        try:
+            await node.decode_stage.run(_verify_image, file_bytes)
+        except Exception as exc:
+            raise HTTPException(400, f'{file.filename} is not a valid image') from exc
+    image_metadatas = [ImageMetadata(source=source, created=creation_date) for _ in files_bytes]
     images_metadata = ImagesMetadata(items=image_metadatas)
 
-    await node.upload_images(images=images,
+    await node.upload_images(images=files_bytes,
                              images_metadata=images_metadata,
                              upload_priority=upload_priority)
     return 200, "OK"
@@ -0,0 +1,66 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from ..data_classes import ImageMetadata
+
+_Key = Tuple[bytes, str]
+
+
+class ResultCache:
+    """LRU cache of detection results for byte-identical images.
+
+    Entries are keyed by a hash of the encoded image bytes (or the raw ndarray buffer) and the model version.
+    Stored and returned results are copies, so callers may modify them freely.
+    A `max_entries` of 0 disables the cache.
+    The cache may be used from worker threads (e.g. the decode stage of the detector node).
+    """
+
+    def __init__(self, max_entries: int = 0) -> None:
+        self.max_entries = max(0, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[_Key, ImageMetadata]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(image: Union[np.ndarray, bytes], model_version: str) -> _Key:
+        if isinstance(image, np.ndarray):
+            digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16)
+            digest.update(f'{image.shape}{image.dtype.str}'.encode())
+        else:
+            digest = hashlib.blake2b(image, digest_size=16)
+        return digest.digest(), model_version
+
+    def get(self, key: _Key) -> Optional[ImageMetadata]:
+        with self._lock:
+            metadata = self._entries.get(key)
+            if metadata is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return copy.deepcopy(metadata)
+
+    def put(self, key: _Key, metadata: ImageMetadata) -> None:
+        metadata = copy.deepcopy(metadata)
+        with self._lock:
+            self._entries[key] = metadata
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,7 @@
 from .annotator import AnnotationEventType
-from .detector import OperationMode, OutboxMode, VersionMode
+from .detector import DetectionPriority, OperationMode, OutboxMode, VersionMode
 from .general import CategoryType
 from .trainer import TrainerState
 
-__all__ = ['VersionMode', 'OperationMode', 'OutboxMode', 'AnnotationEventType', 'CategoryType', 'TrainerState']
+__all__ = ['VersionMode', 'OperationMode', 'OutboxMode', 'DetectionPriority',
+           'AnnotationEventType', 'CategoryType', 'TrainerState']
@@ -13,6 +13,12 @@ class OperationMode(str, Enum):
     Detecting = 'detecting'  # Blocks updates
 
 
+class DetectionPriority(str, Enum):
+    Interactive = 'interactive'  # evaluated before all other requests
+    Bulk = 'bulk'  # e.g. re-evaluation of recorded images
+    Background = 'background'  # only evaluated if nothing else is waiting
+
+
 class OutboxMode(Enum):
     CONTINUOUS_UPLOAD = 'continuous_upload'
     STOPPED = 'stopped'
@@ -226,6 +226,18 @@ def jpg_bytes_to_numpy_array(jpg_bytes: bytes) -> np.ndarray:
     return np.array(image)
 
 
+def decode_image_bytes(image_bytes: bytes, min_size: Optional[int] = None) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Convert encoded image bytes to numpy array and return it together with the original (width, height).
+
+    If min_size is given, JPEGs are decoded at a reduced scale (PIL draft mode) as long as both sides stay >= min_size.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    if min_size:
+        image.draft(image.mode, (min_size, min_size))  # no effect for formats other than JPEG
+    return np.array(image), original_size
+
+
 def numpy_array_to_jpg_bytes(image_array: np.ndarray) -> bytes:
     """Convert jpg bytes to numpy array."""
     buffer = io.BytesIO()
@@ -1,7 +1,8 @@
 import asyncio
+import contextlib
 import logging
 import time
-from typing import Awaitable, Callable, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
 import httpx
 from httpx import Cookies, Timeout
@@ -118,6 +119,15 @@ class LoopCommunicator():
     async def _get(self, path: str, api_prefix: str, timeout: int = 60) -> httpx.Response:
         return await self.async_client.get(api_prefix+path, timeout=timeout)
 
+    @contextlib.asynccontextmanager
+    async def stream(self, path: str, requires_login: bool = True, api_prefix: str = '/api', timeout: int = 60,
+                     headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """GET request whose response body is not loaded into memory but read via `response.aiter_bytes()`."""
+        if requires_login:
+            await self.ensure_login()
+        async with self.async_client.stream('GET', api_prefix+path, headers=headers, timeout=timeout) as response:
+            yield response
+
     async def put(self, path: str, files: Optional[List[str]] = None, requires_login: bool = True, api_prefix: str = '/api', timeout: int = 60, **kwargs) -> httpx.Response:
         if requires_login:
             await self.ensure_login()
@@ -9,7 +9,7 @@ import socket
 from dataclasses import asdict
 from glob import glob
 from multiprocessing import Process, log_to_stderr
-from typing import AsyncGenerator, final
+from typing import AsyncGenerator, Callable, Optional, final
 
 import numpy as np
 import pytest
@@ -22,7 +22,7 @@ from learning_loop_node.detector.detector_logic import DetectorLogic
 from ...detector.detector_node import DetectorNode
 from ...detector.outbox import Outbox
 from ...globals import GLOBALS
-from .testing_detector import TestingDetectorFactory
+from .testing_detector import SlowDetectorFactory, TestingDetectorFactory
 
 logging.basicConfig(level=logging.INFO)
 
@@ -178,6 +178,21 @@ async def detector_node():
         await node._build_and_swap_detector(model_dir)
     return node
 
+
+@pytest.fixture
+def create_detector_node(monkeypatch) -> Callable[..., DetectorNode]:
+    """Return a function which sets the given environment variables and creates a DetectorNode without a model.
+
+    The node uses a SlowDetectorFactory unless another factory is given.
+    """
+    def create(factory: Optional[SlowDetectorFactory] = None, **environment: str) -> DetectorNode:
+        monkeypatch.setenv('LOOP_ORGANIZATION', 'zauberzeug')
+        monkeypatch.setenv('LOOP_PROJECT', 'demo')
+        for name, value in environment.items():
+            monkeypatch.setenv(name, value)
+        return DetectorNode(name='test_node', detector_factory=factory or SlowDetectorFactory())
+    return create
+
 # ====================================== REDUNDANT FIXTURES IN ALL CONFTESTS ! ======================================
 
 
@@ -1,6 +1,7 @@
 # group Tests incoming
+import time
 from dataclasses import asdict
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import List
 
 from dacite import from_dict
@@ -32,50 +33,72 @@ def det_from_seg(seg_detections: List[SegmentationDetection]) -> ImageMetadata:
 
 def test_group_confidence():
     group = CamObservationHistory()
-    assert len(group.recent_observations) == 0
+    assert len(group) == 0
 
     filter_cause = group.get_causes_to_upload(det_from_boxes([dirt_detection]))
     assert filter_cause == ['uncertain'], 'Active Learning should be done due to uncertain'
-    assert len(group.recent_observations) == 1, 'Detection should be stored'
+    assert len(group) == 1, 'Detection should be stored'
 
     filter_cause = group.get_causes_to_upload(det_from_boxes([dirt_detection]))
-    assert len(group.recent_observations) == 1, 'Detection should already be stored'
+    assert len(group) == 1, 'Detection should already be stored'
     assert not filter_cause
 
     filter_cause = group.get_causes_to_upload(det_from_boxes([conf_too_low_detection]))
-    assert len(group.recent_observations) == 1, 'Confidence of detection too low'
+    assert len(group) == 1, 'Confidence of detection too low'
     assert not filter_cause
 
     filter_cause = group.get_causes_to_upload(det_from_boxes([conf_too_high_detection]))
-    assert len(group.recent_observations) == 1, 'Confidence of detection too high'
+    assert len(group) == 1, 'Confidence of detection too high'
     assert not filter_cause
 
 
 def test_add_second_detection_to_group():
     group = CamObservationHistory()
-    assert len(group.recent_observations) == 0
+    assert len(group) == 0
     group.get_causes_to_upload(det_from_boxes([dirt_detection]))
-    assert len(group.recent_observations) == 1, 'Detection should be stored'
+    assert len(group) == 1, 'Detection should be stored'
     group.get_causes_to_upload(det_from_boxes([second_dirt_detection]))
-    assert len(group.recent_observations) == 2, 'Second detection should be stored'
+    assert len(group) == 2, 'Second detection should be stored'
 
 
 def test_forget_old_detections():
     group = CamObservationHistory()
-    assert len(group.recent_observations) == 0
+    assert len(group) == 0
 
     filter_cause = group.get_causes_to_upload(det_from_boxes([dirt_detection]))
     assert filter_cause == ['uncertain'], 'Active Learning should be done due to uncertain.'
 
-    assert len(group.recent_observations) == 1
+    assert len(group) == 1
 
-    group.recent_observations[0].last_seen = datetime.now() - timedelta(minutes=30)
+    group.forget_old_detections(now=time.monotonic() + timedelta(minutes=30).total_seconds())
+    assert len(group) == 1
+
+    group.forget_old_detections(now=time.monotonic() + timedelta(hours=1, minutes=1).total_seconds())
+    assert len(group) == 0
+
+
+def test_refreshed_observations_expire_later(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    group = CamObservationHistory()
+    group.get_causes_to_upload(det_from_boxes([dirt_detection]))
+
+    now += 3000
+    assert not group.get_causes_to_upload(det_from_boxes([dirt_detection])), 'the observation is refreshed'
+    now += 1000
     group.forget_old_detections()
-    assert len(group.recent_observations) == 1
+    assert len(group) == 1, 'the observation was seen 1000 s ago'
 
-    group.recent_observations[0].last_seen = datetime.now() - timedelta(hours=1, minutes=1)
+    now += 3000
     group.forget_old_detections()
-    assert len(group.recent_observations) == 0
+    assert len(group) == 0
+
+
+def test_similar_detections_within_one_image():
+    group = CamObservationHistory()
+    filter_cause = group.get_causes_to_upload(det_from_boxes([dirt_detection, dirt_detection, second_dirt_detection]))
+    assert filter_cause == ['uncertain']
+    assert len(group) == 2, 'the duplicate should only be stored once'
 
 
 def test_active_group_extracts_from_json():
@@ -127,11 +150,11 @@ def test_ignoring_similar_points():
     filter_cause = group.get_causes_to_upload(det_from_points(
         [PointDetection(category_name='point', x=100, y=100, model_name='xyz', confidence=0.3, category_id='some_id')]))
     assert filter_cause == ['uncertain'], 'Active Learning should be done due to low confidence'
-    assert len(group.recent_observations) == 1, 'detection should be stored'
+    assert len(group) == 1, 'detection should be stored'
 
     filter_cause = group.get_causes_to_upload(det_from_points(
         [PointDetection(category_name='point', x=104, y=98, model_name='xyz', confidence=0.3, category_id='some_id')]))
-    assert len(group.recent_observations) == 1, 'detection should already be stored'
+    assert len(group) == 1, 'detection should already be stored'
     assert not filter_cause
 
 
@@ -141,11 +164,11 @@ def test_getting_low_confidence_points():
         [PointDetection(category_name='point', x=100, y=100, model_name='xyz', confidence=0.3, category_id='some_id')])
     )
     assert filter_cause == ['uncertain'], 'Active Learning should be done due to low confidence'
-    assert len(group.recent_observations) == 1, 'detection should be stored'
+    assert len(group) == 1, 'detection should be stored'
 
     filter_cause = group.get_causes_to_upload(det_from_points(
         [PointDetection(category_name='point', x=104, y=98, model_name='xyz', confidence=0.3, category_id='some_id')]))
-    assert len(group.recent_observations) == 1, 'detection should already be stored'
+    assert len(group) == 1, 'detection should already be stored'
     assert not filter_cause
 
 
@@ -154,9 +177,9 @@ def test_getting_segmentation_detections():
     filter_cause = group.get_causes_to_upload(det_from_seg([SegmentationDetection(category_name='segmentation', shape=Shape(
         points=[Point(x=100, y=200), Point(x=300, y=400)]), model_name='xyz', confidence=0.3, category_id='some_id')], ))
     assert filter_cause == ['segmentation_detection'], 'all segmentation detections are collected'
-    # assert len(group.recent_observations) == 1, 'detection should be stored' # NOTE: detector does NOT save history for segmentation detections
+    # assert len(group) == 1, 'detection should be stored' # NOTE: detector does NOT save history for segmentation detections
 
     filter_cause = group.get_causes_to_upload(det_from_seg([SegmentationDetection(category_name='segmentation', shape=Shape(
         points=[Point(x=105, y=205), Point(x=305, y=405)]), model_name='xyz', confidence=0.3, category_id='some_id')], ))
-    # assert len(group.recent_observations) == 2, 'segmentation detections are not filtered by similarity'
+    # assert len(group) == 2, 'segmentation detections are not filtered by similarity'
     assert filter_cause == ['segmentation_detection']
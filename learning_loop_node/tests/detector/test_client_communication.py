@@ -1,6 +1,8 @@
 import asyncio
+import io
 import json
 import os
+import time
 
 import numpy as np
 import pytest
@@ -70,6 +72,24 @@ def test_rest_detect(test_detector_node: DetectorNode, grouping_key: str):
     assert result['segmentation_detections'][0]['category_id'] == 'some_id_3'
 
 
+def test_rest_detect_raw(test_detector_node: DetectorNode):
+    image = np.array(Image.open(test_image_path))
+    headers = {'shape': ','.join(str(s) for s in image.shape), 'dtype': str(image.dtype),
+               'Content-Type': 'application/octet-stream', 'camera_id': '0:0:0:0'}
+
+    response = requests.post(f'http://localhost:{GLOBALS.detector_port}/detect/raw',
+                             data=image.tobytes(), headers=headers, timeout=30)
+    assert response.status_code == 200
+    result = response.json()
+    assert len(result['box_detections']) == 1
+    assert result['box_detections'][0]['category_name'] == 'some_category_name'
+
+    headers['shape'] = '1,2,3'
+    response = requests.post(f'http://localhost:{GLOBALS.detector_port}/detect/raw',
+                             data=image.tobytes(), headers=headers, timeout=30)
+    assert response.status_code == 400
+
+
 def test_rest_upload(test_detector_node: DetectorNode):
     assert len(get_outbox_files(test_detector_node.outbox)) == 0
 
@@ -79,6 +99,47 @@ def test_rest_upload(test_detector_node: DetectorNode):
     assert len(get_outbox_files(test_detector_node.outbox)) == 2, 'There should be one image and one .json file.'
 
 
+def test_rest_upload_keeps_the_original_jpeg(test_detector_node: DetectorNode):
+    with open(test_image_path, 'rb') as f:
+        jpg_bytes = f.read()
+    response = requests.post(f'http://localhost:{GLOBALS.detector_port}/upload',
+                             files={('files', jpg_bytes)}, timeout=30)
+    assert response.status_code == 200
+    uploaded = [file for file in get_outbox_files(test_detector_node.outbox) if file.endswith('.jpg')]
+    assert len(uploaded) == 1
+    with open(uploaded[0], 'rb') as f:
+        assert f.read() == jpg_bytes, 'the image must not be re-encoded'
+
+
+def test_rotated_jpegs_are_stored_in_the_orientation_of_the_detections(test_detector_node: DetectorNode):
+    image = Image.open(test_image_path)
+    exif = image.getexif()
+    exif[0x0112] = 6  # rotated by 90 degrees
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    response = requests.post(f'http://localhost:{GLOBALS.detector_port}/detect', files={('file', buffer.getvalue())},
+                             headers={'autoupload': 'all'}, timeout=30)
+    assert response.status_code == 200
+    for _ in range(50):
+        uploaded = [file for file in get_outbox_files(test_detector_node.outbox) if file.endswith('.jpg')]
+        if uploaded:
+            break
+        time.sleep(0.1)
+    assert len(uploaded) == 1
+    stored = Image.open(uploaded[0])
+    assert stored.size == image.size, 'the detections were computed on the raw (not rotated) pixels'
+    assert stored.getexif().get(0x0112, 1) == 1, 'viewers must not rotate the stored image'
+    with open(uploaded[0].replace('.jpg', '.json')) as f:
+        assert json.load(f)['box_detections'] == response.json()['box_detections']
+
+
+def test_rest_upload_rejects_invalid_images(test_detector_node: DetectorNode):
+    response = requests.post(f'http://localhost:{GLOBALS.detector_port}/upload',
+                             files={('files', b'not an image')}, timeout=30)
+    assert response.status_code == 400
+    assert len(get_outbox_files(test_detector_node.outbox)) == 0
+
+
 @pytest.mark.parametrize('test_detector_node', [True], indirect=True)
 async def test_sio_upload(test_detector_node: DetectorNode, sio_client):
     assert len(get_outbox_files(test_detector_node.outbox)) == 0
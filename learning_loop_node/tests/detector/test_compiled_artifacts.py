@@ -0,0 +1,88 @@
+import os
+from typing import List
+
+import pytest
+
+from ...data_classes import ModelInformation
+from ...detector.compiled_artifacts import CompiledArtifactCache
+from ...detector.detector_logic import build_detector_logic
+from ...detector.model_store import ModelStore
+from ...globals import GLOBALS
+from .testing_detector import write_model
+
+MODEL_INFO = ModelInformation(id='test', host='', organization='zauberzeug', project='demo', version='1.0')
+
+
+class CompilingDetectorFactory:
+    model_format = 'tensorrt'
+    artifact_fingerprint = 'gpu-a'
+
+    def __init__(self) -> None:
+        self.compiled: List[str] = []
+
+    async def build(self, model_info: ModelInformation, artifact_cache: CompiledArtifactCache) -> object:
+        artifact_cache.get_or_compile('model.engine', self._compile)
+        return object()
+
+    def _compile(self, path: str) -> None:
+        self.compiled.append(path)
+        open(path, 'w').close()
+
+
+def test_artifacts_are_compiled_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    compiled: List[str] = []
+
+    def compile_engine(path: str) -> None:
+        compiled.append(path)
+        with open(path, 'w') as f:
+            f.write('engine')
+
+    cache = CompiledArtifactCache(MODEL_INFO, 'tensorrt', fingerprint='gpu-a')
+    assert cache.lookup('model.engine') is None
+    path = cache.get_or_compile('model.engine', compile_engine)
+    assert CompiledArtifactCache(MODEL_INFO, 'tensorrt', fingerprint='gpu-a').get_or_compile(
+        'model.engine', compile_engine) == path, 'a restart reuses the compiled artifact'
+    assert len(compiled) == 1
+    assert open(path).read() == 'engine'
+    assert not any(name.endswith('.tmp') for name in os.listdir(cache.folder))
+
+    other_gpu = CompiledArtifactCache(MODEL_INFO, 'tensorrt', fingerprint='gpu-b')
+    assert other_gpu.folder != cache.folder
+    assert other_gpu.get_or_compile('model.engine', compile_engine) != path
+    assert len(compiled) == 2
+
+
+def test_failed_compilation_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    cache = CompiledArtifactCache(MODEL_INFO, 'tensorrt')
+
+    def fail(path: str) -> None:
+        with open(path, 'w') as f:
+            f.write('half an engine')
+        raise RuntimeError('out of memory')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compile('model.engine', fail)
+    assert cache.lookup('model.engine') is None
+    assert os.listdir(cache.folder) == []
+
+
+def test_artifacts_are_removed_with_the_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    write_model('1.0')
+    cache = CompiledArtifactCache(MODEL_INFO, 'tensorrt')
+    cache.get_or_compile('model.engine', lambda path: open(path, 'w').close())
+
+    ModelStore().remove('1.0')
+
+    assert not os.path.exists(CompiledArtifactCache.model_folder('test'))
+
+
+async def test_compiling_factories_get_the_artifact_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    factory = CompilingDetectorFactory()
+    await build_detector_logic(factory, MODEL_INFO)
+    await build_detector_logic(factory, MODEL_INFO)
+    assert len(factory.compiled) == 1, 'the second build reuses the compiled engine'
+    assert factory.compiled[0].startswith(CompiledArtifactCache.model_folder('test'))
@@ -3,8 +3,15 @@ from typing import List, Literal, Tuple
 import numpy as np
 import pytest
 
+from learning_loop_node.data_classes import (
+    BoxDetection,
+    Category,
+    ClassificationDetection,
+    ImageMetadata,
+    ModelInformation,
+)
 from learning_loop_node.detector import detector_node as detector_node_module
-from learning_loop_node.detector.detector_node import DetectorNode
+from learning_loop_node.detector.detector_node import DetectorNode, _ActiveDetector
 
 
 @pytest.mark.asyncio
@@ -96,3 +103,25 @@ async def test_get_detections(detector_node: DetectorNode, monkeypatch):
                     assert np.array_equal(value, expected)
                 else:
                     assert value == expected
+
+
+def test_add_category_id_to_detections(detector_node: DetectorNode):
+    active = detector_node._detector  # pylint: disable=protected-access
+    assert isinstance(active, _ActiveDetector)
+    model_info = active.model_info
+    model_info.categories = [Category(id='1', name='a'), Category(id='2', name='b'), Category(id='3', name='a')]
+    active.category_ids = detector_node_module.category_index(model_info.categories)
+    assert active.category_ids == {'a': '1', 'b': '2'}, 'the first category wins'
+
+    metadata = ImageMetadata(
+        box_detections=[BoxDetection(category_name='b', x=0, y=0, width=1, height=1, model_name='m', confidence=1),
+                        BoxDetection(category_name='unknown', x=0, y=0, width=1, height=1, model_name='m', confidence=1)],
+        classification_detections=[ClassificationDetection(category_name='a', model_name='m', confidence=1)])
+    detector_node.add_category_id_to_detections(model_info, metadata)
+    assert [d.category_id for d in metadata.box_detections] == ['2', '']
+    assert metadata.classification_detections[0].category_id == '1'
+
+    other_model = ModelInformation(id='other', host='', organization='o', project='p', version='1.0',
+                                   categories=[Category(id='9', name='b')])
+    detector_node.add_category_id_to_detections(other_model, metadata)
+    assert metadata.box_detections[0].category_id == '9', 'models other than the loaded one are indexed on the fly'
@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+import time
+
+import numpy as np
+
+from ...data_classes import ModelInformation
+from ...detector import detector_node as detector_node_module
+from ...detector.detector_node import _ActiveDetector
+from ...enums import OperationMode
+from .testing_detector import SlowDetectorFactory, write_model
+
+
+async def test_requests_are_distributed_over_replicas(create_detector_node):
+    factory = SlowDetectorFactory()
+    node = create_detector_node(factory, DETECTOR_REPLICAS='3')
+    await node._build_and_swap_detector(write_model('1.0'))  # pylint: disable=protected-access
+    assert factory.build_count == 3
+
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    start = time.time()
+    await asyncio.gather(*[node.get_detections(image, [], autoupload='disabled') for _ in range(3)])
+    assert time.time() - start < 0.5, 'requests should be evaluated in parallel'
+
+    assert isinstance(node._detector, _ActiveDetector)  # pylint: disable=protected-access
+    assert all(len(logic.evaluating_threads) == 1 for logic in node._detector.pool)  # type: ignore # pylint: disable=protected-access
+
+    await node._build_and_swap_detector(write_model('2.0'))  # pylint: disable=protected-access
+    assert factory.build_count == 6
+    assert all(logic.version == '2.0' for logic in node._detector.pool)  # type: ignore # pylint: disable=protected-access
+    result = await node.get_detections(image, [], autoupload='disabled')
+    assert result.tags == ['2.0']
+    await node.inference_scheduler.shutdown()
+
+
+async def test_exclusive_build_replaces_whole_pool(create_detector_node):
+    node = create_detector_node(DETECTOR_REPLICAS='2', EXCLUSIVE_MODEL_BUILD='1')
+    await node._build_and_swap_detector(write_model('1.0'))  # pylint: disable=protected-access
+    await node._build_and_swap_detector(write_model('2.0'))  # pylint: disable=protected-access
+
+    assert isinstance(node._detector, _ActiveDetector)  # pylint: disable=protected-access
+    assert [logic.version for logic in node._detector.pool] == ['2.0', '2.0']  # type: ignore # pylint: disable=protected-access
+
+
+async def test_new_model_is_warmed_up_before_swap(create_detector_node):
+    node = create_detector_node(DETECTOR_REPLICAS='2', MODEL_WARMUP_RUNS='2', DETECTION_BATCH_SIZE='4')
+    await node._build_and_swap_detector(write_model('1.0'))  # pylint: disable=protected-access
+
+    detector = node._detector  # pylint: disable=protected-access
+    assert isinstance(detector, _ActiveDetector)
+    assert all(len(logic.evaluating_threads) == 2 for logic in detector.pool)  # type: ignore
+    assert not detector.supports_batch, 'batch_evaluate raised NotImplementedError during warm-up'
+    assert detector.warmup_s is not None and detector.warmup_s >= 0.8
+    assert node.get_about_response().model_warmup_s == detector.warmup_s
+
+
+async def test_previous_model_is_kept_as_standby(monkeypatch, create_detector_node):
+    # pylint: disable=protected-access
+    factory = SlowDetectorFactory()
+    node = create_detector_node(factory, STANDBY_DETECTOR_MAX_MB='10')
+
+    async def sync_status():
+        pass
+    monkeypatch.setattr(node, '_sync_status_with_loop', sync_status)
+
+    await node._build_and_swap_detector(write_model('1.0'))
+    await node._build_and_swap_detector(write_model('2.0'))
+    assert node.get_about_response().standby_model == '1.0'
+
+    await node._update_model(ModelInformation.load_from_disk(write_model('1.0')))  # type: ignore
+    assert factory.build_count == 2, 'the rollback to 1.0 must not build the model again'
+    assert node._detector.model_info.version == '1.0'  # type: ignore
+    assert node.get_about_response().standby_model == '2.0'
+
+    memory = itertools.count(step=20 * 1024 * 1024)  # every build grows the resident memory by 20 MB
+    monkeypatch.setattr(detector_node_module, '_resident_memory_bytes', lambda: next(memory))
+    await node._build_and_swap_detector(write_model('3.0'))
+    await node._build_and_swap_detector(write_model('2.0'))
+    assert node._standby is None, 'model 3.0 exceeds the memory budget'
+
+    monkeypatch.setattr(detector_node_module, '_resident_memory_bytes', lambda: None)
+    await node._build_and_swap_detector(write_model('1.0'))
+    await node._build_and_swap_detector(write_model('3.0'))
+    assert node._standby is None, 'the memory of model 1.0 is unknown'
+
+
+async def test_rollback_to_the_standby_is_immediate_while_detecting(monkeypatch, create_detector_node):
+    # pylint: disable=protected-access
+    factory = SlowDetectorFactory()
+    node = create_detector_node(factory, STANDBY_DETECTOR_MAX_MB='10')
+    node.operation_mode = OperationMode.Detecting
+
+    async def sync_status():
+        pass
+    monkeypatch.setattr(node, '_sync_status_with_loop', sync_status)
+
+    await node._build_and_swap_detector(write_model('1.0'))
+    await node._build_and_swap_detector(write_model('2.0'))
+    node.target_model = node._detector.model_info  # type: ignore
+    assert node._standby is not None
+
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    detection = asyncio.create_task(node.get_detections(image, [], autoupload='disabled'))
+    await asyncio.sleep(0.05)
+    await node.set_model_version_mode('1.0')
+    assert node._detector.model_info.version == '1.0', 'no waiting for the repeat cycle'  # type: ignore
+    assert node.get_about_response().standby_model == '2.0'
+    assert (await detection).tags == ['2.0'], 'the running detection finishes with the previous model'
+    assert (await node.get_detections(image, [], autoupload='disabled')).tags == ['1.0']
+    assert factory.build_count == 2
+    await node.inference_scheduler.shutdown()
@@ -0,0 +1,198 @@
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from ...data_classes import ImageMetadata, ImagesMetadata
+from ...detector.detector_node import DetectorNode, _ActiveDetector
+from ...detector.exceptions import DetectorOverloadedError, FrameSupersededError
+from ...detector.inference_scheduler import InferenceScheduler
+from ...enums import DetectionPriority
+
+
+async def test_concurrent_requests_are_batched():
+    batch_sizes: List[int] = []
+
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        batch_sizes.append(len(images))
+        return [ImageMetadata(tags=[str(int(image[0, 0]))]) for image in images]
+
+    scheduler = InferenceScheduler(evaluate_batch, max_batch_size=4, batch_window_s=0.05)
+    images = [np.full((2, 2), i, dtype=np.uint8) for i in range(6)]
+    results = await asyncio.gather(*[scheduler.submit(image) for image in images])
+    await scheduler.shutdown()
+
+    assert [r.tags for r in results] == [[str(i)] for i in range(6)], 'every caller gets its own result'
+    assert batch_sizes == [4, 2]
+
+
+async def test_batch_errors_are_propagated_to_all_callers():
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        raise ValueError('broken model')
+
+    scheduler = InferenceScheduler(evaluate_batch, max_batch_size=2, batch_window_s=0.05)
+    results = await asyncio.gather(*[scheduler.submit(np.zeros((2, 2))) for _ in range(2)], return_exceptions=True)
+    await scheduler.shutdown()
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+async def test_node_falls_back_to_single_evaluation(detector_node: DetectorNode):
+    detector_node.inference_scheduler.max_batch_size = 4
+    detector_node.inference_scheduler.batch_window_s = 0.05
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+
+    results = await asyncio.gather(*[detector_node.get_detections(image, [], autoupload='disabled') for _ in range(3)])
+    await detector_node.inference_scheduler.shutdown()
+
+    assert all(len(r.box_detections) == 1 for r in results)
+    assert isinstance(detector_node._detector, _ActiveDetector)  # pylint: disable=protected-access
+    assert detector_node._detector.supports_batch is False  # pylint: disable=protected-access
+
+
+async def test_node_uses_batch_evaluate(detector_node: DetectorNode, monkeypatch):
+    assert isinstance(detector_node._detector, _ActiveDetector)  # pylint: disable=protected-access
+    logic = detector_node._detector.logic  # pylint: disable=protected-access
+    batch_sizes: List[int] = []
+
+    def batch_evaluate(images: List[np.ndarray]) -> ImagesMetadata:
+        batch_sizes.append(len(images))
+        return ImagesMetadata(items=[ImageMetadata() for _ in images])
+    monkeypatch.setattr(logic, 'batch_evaluate', batch_evaluate)
+
+    detector_node.inference_scheduler.max_batch_size = 4
+    detector_node.inference_scheduler.batch_window_s = 0.05
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+
+    await asyncio.gather(*[detector_node.get_detections(image, [], autoupload='disabled') for _ in range(4)])
+    await detector_node.inference_scheduler.shutdown()
+
+    assert batch_sizes == [4]
+
+
+async def test_full_queue_rejects_requests():
+    release = asyncio.Event()
+
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        await release.wait()
+        return [ImageMetadata() for _ in images]
+
+    scheduler = InferenceScheduler(evaluate_batch, max_queue_depth=2)
+    accepted = [asyncio.create_task(scheduler.submit(np.zeros((2, 2))))]
+    await asyncio.sleep(0.01)
+    accepted += [asyncio.create_task(scheduler.submit(np.zeros((2, 2)))) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    assert scheduler.queue_depth == 2, 'one request is in progress, two are waiting'
+
+    with pytest.raises(DetectorOverloadedError) as exc_info:
+        await scheduler.submit(np.zeros((2, 2)))
+    assert exc_info.value.retry_after_s >= 1
+
+    release.set()
+    assert len(await asyncio.gather(*accepted)) == 3
+    assert scheduler.queue_depth == 0
+    await scheduler.shutdown()
+
+
+async def test_requests_waiting_too_long_are_rejected():
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        await asyncio.sleep(0.3)
+        return [ImageMetadata() for _ in images]
+
+    scheduler = InferenceScheduler(evaluate_batch, max_wait_s=0.1)
+    results = await asyncio.gather(*[scheduler.submit(np.zeros((2, 2))) for _ in range(2)], return_exceptions=True)
+    await scheduler.shutdown()
+
+    assert isinstance(results[0], ImageMetadata), 'the first request is in progress and must not time out'
+    assert isinstance(results[1], DetectorOverloadedError)
+    assert scheduler.queue_depth == 0
+
+
+async def test_about_response_contains_queue_depth(detector_node: DetectorNode):
+    assert detector_node.get_about_response().inference_queue_depth == 0
+
+
+async def test_newer_frame_supersedes_waiting_frame_of_same_camera():
+    evaluated: List[int] = []
+
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        evaluated.extend(int(image[0, 0]) for image in images)
+        await asyncio.sleep(0.05)
+        return [ImageMetadata() for _ in images]
+
+    scheduler = InferenceScheduler(evaluate_batch)
+    requests = [
+        scheduler.submit(np.full((2, 2), 0), camera_id='front', latest_frame_only=True),  # in progress
+        scheduler.submit(np.full((2, 2), 1), camera_id='front', latest_frame_only=True),  # superseded by 3
+        scheduler.submit(np.full((2, 2), 2), camera_id='back', latest_frame_only=True),
+        scheduler.submit(np.full((2, 2), 3), camera_id='front', latest_frame_only=True),
+        scheduler.submit(np.full((2, 2), 4), camera_id='front'),  # not in latest-frame-only mode
+    ]
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.create_task(request))
+        await asyncio.sleep(0.001)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    await scheduler.shutdown()
+
+    assert isinstance(results[1], FrameSupersededError)
+    assert all(isinstance(r, ImageMetadata) for i, r in enumerate(results) if i != 1)
+    assert evaluated == [0, 2, 3, 4], 'the newest frame takes over the position of the superseded one'
+
+
+async def test_higher_priority_requests_are_dispatched_first():
+    evaluated: List[int] = []
+
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        evaluated.extend(int(image[0, 0]) for image in images)
+        await asyncio.sleep(0.05)
+        return [ImageMetadata() for _ in images]
+
+    scheduler = InferenceScheduler(evaluate_batch)
+    requests = [
+        scheduler.submit(np.full((2, 2), 0)),  # in progress
+        scheduler.submit(np.full((2, 2), 1), priority=DetectionPriority.Background),
+        scheduler.submit_batch([np.full((2, 2), 2), np.full((2, 2), 3)], priority=DetectionPriority.Bulk),
+        scheduler.submit(np.full((2, 2), 4), priority=DetectionPriority.Interactive),
+    ]
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.create_task(request))
+        await asyncio.sleep(0.001)
+    results = await asyncio.gather(*tasks)
+    await scheduler.shutdown()
+
+    assert len(results[2]) == 2, 'a batch request receives one result per image'
+    assert evaluated == [0, 4, 2, 3, 1]
+
+
+async def test_cameras_share_the_detector_fairly():
+    evaluated: List[str] = []
+    all_submitted = asyncio.Event()
+
+    async def evaluate_batch(images: List[np.ndarray], slot: int) -> List[ImageMetadata]:  # pylint: disable=unused-argument
+        evaluated.extend('ab'[int(image[0, 0])] for image in images)
+        await all_submitted.wait()
+        return [ImageMetadata() for _ in images]
+
+    scheduler = InferenceScheduler(evaluate_batch)
+    tasks = []
+    for camera_id in 'aaaabb':
+        tasks.append(asyncio.create_task(scheduler.submit(np.full((2, 2), 'ab'.index(camera_id)), camera_id=camera_id)))
+        await asyncio.sleep(0.001)
+    all_submitted.set()
+    await asyncio.gather(*tasks)
+    await scheduler.shutdown()
+
+    assert evaluated == list('ababaa'), 'camera b must not wait until all requests of camera a are done'
+
+
+async def test_node_schedules_batch_detections(detector_node: DetectorNode):
+    images = [np.zeros((10, 10, 3), dtype=np.uint8) for _ in range(3)]
+
+    results = await detector_node.get_batch_detections(images, [], autoupload='disabled')
+    await detector_node.inference_scheduler.shutdown()
+
+    assert len(results.items) == 3
+    assert all(len(r.box_detections) == 1 for r in results.items), 'falls back to single evaluation'
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+from ...detector.detector_node import _ActiveDetector
+from ...detector.model_store import ModelStore
+from ...enums import OperationMode, VersionMode
+from ...globals import GLOBALS
+from ...helpers import background_tasks
+from .testing_detector import write_model
+
+
+def add_model(store: ModelStore, version: str, size: int) -> None:
+    os.makedirs(store.folder(version))
+    with open(os.path.join(store.folder(version), 'weights.bin'), 'wb') as f:
+        f.write(b'0' * size)
+    store.touch(version)
+    time.sleep(0.01)
+
+
+def test_least_recently_used_models_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    store = ModelStore(max_bytes=2500)
+    for version in ['1.0', '2.0', '3.0']:
+        add_model(store, version, 1000)
+    store.touch('1.0', build_succeeded=True)
+
+    assert store.evict(keep=['2.0']) == ['3.0'], '2.0 is in use and 1.0 was used recently'
+    entries = store.entries()
+    assert sorted(entries) == ['1.0', '2.0']
+    assert entries['1.0'].size == 1000 and entries['1.0'].build_succeeded
+    assert entries['2.0'].build_succeeded is None
+
+    add_model(store, '4.0', 1000)
+    assert store.evict(keep=['2.0', '4.0']) == ['1.0']
+    assert store.evict(keep=['2.0', '4.0']) == []
+
+
+def test_unknown_folders_are_part_of_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(GLOBALS, 'data_folder', str(tmp_path))
+    store = ModelStore()
+    os.makedirs(store.folder('1.0'))
+    with open(os.path.join(store.folder('1.0'), 'model.json'), 'w') as f:
+        f.write('{}')
+    os.makedirs(store.folder('2.0'))  # empty folders are no models
+
+    assert list(store.entries()) == ['1.0']
+    assert store.evict(keep=[]) == [], 'no budget'
+
+
+async def test_switching_to_a_stored_version_skips_the_loop(monkeypatch, create_detector_node):
+    # pylint: disable=protected-access
+    node = create_detector_node()
+    node.operation_mode = OperationMode.Idle
+    await node._build_and_swap_detector(write_model('1.0'))
+    write_model('2.0')
+
+    async def get(*args, **kwargs):
+        raise AssertionError('the loop must not be asked for stored models')
+
+    async def sync_status():
+        pass
+
+    monkeypatch.setattr(node.loop_communicator, 'get', get)
+    monkeypatch.setattr(node, '_sync_status_with_loop', sync_status)
+
+    await node.set_model_version_mode('2.0')
+    assert node.target_model is not None and node.target_model.version == '2.0'
+    await asyncio.gather(*background_tasks.running_tasks)  # the build runs in the background, not in the handler
+
+    assert node.version_control == VersionMode.SpecificVersion
+    assert isinstance(node._detector, _ActiveDetector)
+    assert node._detector.model_info.version == '2.0'
+    assert node.model_store.entries()['2.0'].build_succeeded
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+import shutil
+from dataclasses import asdict
+from unittest.mock import MagicMock
+
+from ...data_classes import ModelInformation
+from ...detector.detector_node import _ActiveDetector
+from ...enums import OperationMode
+
+
+async def test_new_model_is_downloaded_in_background(monkeypatch, create_detector_node):
+    # pylint: disable=protected-access
+    node = create_detector_node()
+    node.operation_mode = OperationMode.Detecting
+    shutil.rmtree(node.model_store.folder('42.0'), ignore_errors=True)
+
+    async def get(*args, **kwargs):
+        return MagicMock(status_code=200, json=lambda: {'model_uuid': 'some-uuid', 'version': '42.0'})
+
+    async def sync_status():
+        pass
+
+    download_may_finish = asyncio.Event()
+    download_folders = []
+
+    async def download_model(target_folder: str, *args):
+        download_folders.append(target_folder)
+        await download_may_finish.wait()
+        model_info = ModelInformation(id='some-uuid', host='', organization='zauberzeug', project='demo', version='42.0')
+        with open(os.path.join(target_folder, 'model.json'), 'w') as f:
+            json.dump(asdict(model_info), f)
+        return [os.path.join(target_folder, 'model.json')]
+
+    monkeypatch.setattr(node.loop_communicator, 'get', get)
+    monkeypatch.setattr(node, '_sync_status_with_loop', sync_status)
+    monkeypatch.setattr(node.data_exchanger, 'download_model', download_model)
+
+    await node._update_model_if_required()
+    assert list(node._model_downloads) == ['42.0'], 'the download starts even while detecting'
+
+    node.operation_mode = OperationMode.Idle
+    await asyncio.wait_for(node._update_model_if_required(), timeout=1)
+    assert not isinstance(node._detector, _ActiveDetector), 'the model is swapped once the download is complete'
+
+    download_may_finish.set()
+    await asyncio.wait_for(node._model_downloads['42.0'], timeout=1)
+    assert not os.path.exists(download_folders[0])
+    await node._update_model_if_required()
+
+    assert isinstance(node._detector, _ActiveDetector)
+    assert node._detector.model_info.version == '42.0'
+    assert node._current_model_path() == node.model_store.folder('42.0')
+    assert len(download_folders) == 1
+    shutil.rmtree(node.model_store.folder('42.0'))
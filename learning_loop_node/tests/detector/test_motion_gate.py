@@ -0,0 +1,45 @@
+import numpy as np
+
+from ...data_classes import ImageMetadata
+from ...detector.detector_node import DetectorNode
+from ...detector.motion_gate import REUSED_TAG, MotionGate
+
+
+def test_unchanged_frames_reuse_detections():
+    gate = MotionGate(threshold=0.01)
+    image = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+    thumbnail = gate.thumbnail(image)
+    assert thumbnail.shape == (32, 42)
+    assert gate.lookup('cam', thumbnail, '1.0') is None, 'no reference frame yet'
+    gate.update('cam', thumbnail, '1.0', ImageMetadata(tags=['evaluated']))
+
+    noisy = np.clip(image.astype(int) + np.random.default_rng(1).integers(-2, 3, image.shape), 0, 255).astype(np.uint8)
+    metadata = gate.lookup('cam', gate.thumbnail(noisy), '1.0')
+    assert metadata is not None and metadata.tags == ['evaluated', REUSED_TAG]
+
+    assert gate.lookup('other_cam', thumbnail, '1.0') is None
+    assert gate.lookup('cam', thumbnail, '2.0') is None, 'detections of another model must not be reused'
+    assert gate.lookup('cam', gate.thumbnail(255 - image), '1.0') is None
+
+
+def test_gray_and_float_images():
+    gate = MotionGate(threshold=0.01)
+    assert gate.thumbnail(np.full((100, 100), 255, dtype=np.uint8)).max() == 1.0
+    assert gate.thumbnail(np.full((100, 100, 3), 0.5, dtype=np.float32)).max() == 0.5
+
+
+async def test_node_skips_inference_for_unchanged_frames(detector_node: DetectorNode):
+    detector_node.motion_gate = MotionGate(threshold=0.01)
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+
+    first = await detector_node.get_detections(image, [], camera_id='cam', autoupload='disabled')
+    second = await detector_node.get_detections(image, [], camera_id='cam', autoupload='disabled')
+    third = await detector_node.get_detections(image + 100, [], camera_id='cam', autoupload='disabled')
+    no_camera = await detector_node.get_detections(image, [], autoupload='disabled')
+    await detector_node.inference_scheduler.shutdown()
+
+    assert REUSED_TAG not in first.tags
+    assert REUSED_TAG in second.tags and second.box_detections == first.box_detections
+    assert REUSED_TAG not in third.tags
+    assert REUSED_TAG not in no_camera.tags
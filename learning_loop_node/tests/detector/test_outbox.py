@@ -22,6 +22,7 @@ async def test_outbox():
     yield test_outbox
 
     await test_outbox.set_mode('stopped')
+    await test_outbox.stop()
     shutil.rmtree(test_outbox.path, ignore_errors=True)
 
 
@@ -45,6 +46,7 @@ async def fix_upload_bug():
     # assert test_outbox.upload_counter == 2
 
     await test_outbox.set_mode('stopped')
+    await test_outbox.stop()
     shutil.rmtree(test_outbox.path, ignore_errors=True)
 
 
@@ -60,6 +62,17 @@ async def test_set_outbox_mode(test_outbox: Outbox):
     assert await wait_for_outbox_count(test_outbox, 0, timeout=15), 'File was not cleared even though outbox should be in continuous_upload'
     assert test_outbox.upload_counter == 1
 
+
+@pytest.mark.asyncio
+async def test_save_many(test_outbox: Outbox):
+    await test_outbox.set_mode('stopped')
+    await test_outbox.save_many([get_test_image() for _ in range(5)])
+    folders = test_outbox.get_upload_folders()
+    assert len(folders) == 5
+    assert len(set(folders)) == 5, 'images saved at the same time need distinct folders'
+    for folder in folders:
+        assert len(os.listdir(folder)) == 2, 'image and metadata'
+
 # ------------------------------ Helper functions --------------------------------------
 
 
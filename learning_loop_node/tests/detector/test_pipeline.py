@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+from ...detector.pipeline import PipelineStage
+
+
+async def test_stage_runs_functions_on_its_worker_threads():
+    stage = PipelineStage('decode', workers=2)
+    try:
+        thread_name = await stage.run(lambda: threading.current_thread().name)
+    finally:
+        stage.shutdown()
+    assert thread_name.startswith('decode_stage')
+
+
+async def test_stage_bounds_running_and_queued_calls():
+    stage = PipelineStage('postprocess', workers=2, queue_size=1)
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def work() -> None:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    try:
+        tasks = [asyncio.create_task(stage.run(work)) for _ in range(6)]
+        await asyncio.sleep(0.02)
+        assert stage.queue_depth == 3, 'two calls are running, one is queued and the others wait for admission'
+        await asyncio.gather(*tasks)
+    finally:
+        stage.shutdown()
+    assert max_running == 2
+    assert stage.queue_depth == 0
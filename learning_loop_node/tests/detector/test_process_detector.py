@@ -0,0 +1,102 @@
+import gc
+import os
+import time
+import weakref
+from typing import List
+
+import numpy as np
+import pytest
+
+from ...data_classes import ImageMetadata, ImagesMetadata, ModelInformation
+from ...detector.exceptions import InferenceWorkerError
+from ...detector.process_detector import ProcessDetectorLogic, ProcessDetectorLogicFactory
+
+CRASH = 7
+HANG = 9
+INVALID = 5
+UNPICKLABLE = 6
+
+
+class UnpicklableError(Exception):
+
+    def __init__(self) -> None:
+        super().__init__('unpicklable')
+        self.callback = lambda: None
+
+
+class PidDetectorLogic:
+    """Reports the sum of the image and the pid of the process it runs in; crashes, hangs or raises on request."""
+
+    def __init__(self, model_info: ModelInformation) -> None:
+        self.version = model_info.version
+
+    def evaluate(self, image: np.ndarray) -> ImageMetadata:
+        if image.flat[0] == CRASH:
+            os._exit(1)
+        if image.flat[0] == HANG:
+            time.sleep(60)
+        if image.flat[0] == INVALID:
+            raise ValueError('invalid image')
+        if image.flat[0] == UNPICKLABLE:
+            raise UnpicklableError()
+        return ImageMetadata(tags=[str(os.getpid()), str(int(image.sum()))])
+
+    def batch_evaluate(self, images: List[np.ndarray]) -> ImagesMetadata:
+        return ImagesMetadata(items=[self.evaluate(image) for image in images])
+
+
+class PidDetectorFactory:
+    model_format = 'mocked'
+
+    async def build(self, model_info: ModelInformation) -> PidDetectorLogic:
+        return PidDetectorLogic(model_info)
+
+
+@pytest.fixture
+async def process_detector():
+    factory = ProcessDetectorLogicFactory(PidDetectorFactory(), timeout_s=2, buffer_size=1024)
+    model_info = ModelInformation(id='test', host='', organization='zauberzeug', project='demo', version='1.0')
+    return await factory.build(model_info)
+
+
+async def test_evaluation_runs_in_worker_process(process_detector: ProcessDetectorLogic):
+    image = np.ones((10, 10, 3), dtype=np.uint8)
+    result = process_detector.evaluate(image)
+    assert result.tags == [str(process_detector._workers[0].process.pid), '300']  # pylint: disable=protected-access
+    assert result.tags[0] != str(os.getpid())
+
+    large_images = [np.full((40, 40, 3), 3, dtype=np.uint8) for _ in range(2)]  # exceeds the initial buffer
+    results = process_detector.batch_evaluate(large_images)
+    assert [r.tags[1] for r in results.items] == ['14400', '14400']
+
+
+@pytest.mark.parametrize('failure', [CRASH, HANG])
+async def test_failed_worker_is_restarted(process_detector: ProcessDetectorLogic, failure: int):
+    first_pid = process_detector._workers[0].process.pid  # pylint: disable=protected-access
+
+    with pytest.raises(InferenceWorkerError):
+        process_detector.evaluate(np.full((2, 2), failure, dtype=np.uint8))
+
+    result = process_detector.evaluate(np.zeros((2, 2), dtype=np.uint8))
+    assert result.tags[0] != str(first_pid), 'a new worker process should have been started'
+
+
+async def test_exceptions_keep_their_type(process_detector: ProcessDetectorLogic):
+    with pytest.raises(ValueError, match='invalid image'):
+        process_detector.evaluate(np.full((2, 2), INVALID, dtype=np.uint8))
+    with pytest.raises(RuntimeError, match='UnpicklableError'):
+        process_detector.evaluate(np.full((2, 2), UNPICKLABLE, dtype=np.uint8))
+    assert process_detector.evaluate(np.zeros((2, 2), dtype=np.uint8)).tags[1] == '0', 'the worker is still alive'
+
+
+def test_restart_does_not_keep_the_proxy_alive(monkeypatch):
+    factory = ProcessDetectorLogicFactory(PidDetectorFactory(), timeout_s=2, buffer_size=1024)
+    detector = ProcessDetectorLogic(factory, ModelInformation(id='test', host='', organization='zauberzeug',
+                                                              project='demo', version='1.0'))
+    monkeypatch.setattr(detector.log, 'disabled', True)  # captured log records would keep the traceback alive
+    with pytest.raises(InferenceWorkerError):
+        detector.evaluate(np.full((2, 2), CRASH, dtype=np.uint8))
+    proxy = weakref.ref(detector)
+    del detector
+    gc.collect()
+    assert proxy() is None
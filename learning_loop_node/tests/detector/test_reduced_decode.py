@@ -0,0 +1,56 @@
+from typing import List
+
+import numpy as np
+
+from ...data_classes import BoxDetection, ImageMetadata, Point, PointDetection, SegmentationDetection, Shape
+from ...detector.detector_node import DetectorNode, _ActiveDetector, scale_detections
+from ...helpers.misc import decode_image_bytes, numpy_array_to_jpg_bytes
+
+
+def test_jpeg_is_decoded_at_reduced_scale():
+    jpg = numpy_array_to_jpg_bytes(np.zeros((600, 800, 3), dtype=np.uint8))
+
+    image, original_size = decode_image_bytes(jpg, min_size=100)
+    assert original_size == (800, 600)
+    assert image.shape == (150, 200, 3), 'the smallest draft scale keeping both sides >= 100 px is 1/4'
+
+    image, _ = decode_image_bytes(jpg)
+    assert image.shape == (600, 800, 3)
+
+
+def test_detections_are_scaled():
+    metadata = ImageMetadata(
+        box_detections=[BoxDetection(category_name='a', x=1, y=2, width=3, height=4, model_name='m', confidence=1)],
+        point_detections=[PointDetection(category_name='b', x=1.5, y=2, model_name='m', confidence=1)],
+        segmentation_detections=[
+            SegmentationDetection(category_name='c', shape=Shape(points=[Point(x=1, y=2)]), model_name='m', confidence=1),
+            SegmentationDetection(category_name='c', shape='1,2,3,4', model_name='m', confidence=1)])
+
+    scale_detections(metadata, 2, 3)
+
+    box = metadata.box_detections[0]
+    assert (box.x, box.y, box.width, box.height) == (2, 6, 6, 12)
+    assert (metadata.point_detections[0].x, metadata.point_detections[0].y) == (3, 6)
+    assert metadata.segmentation_detections[0].shape == Shape(points=[Point(x=2, y=6)])
+    assert metadata.segmentation_detections[1].shape == '2,6,6,12'
+
+
+async def test_node_decodes_at_model_resolution(detector_node: DetectorNode, monkeypatch):
+    assert isinstance(detector_node._detector, _ActiveDetector)  # pylint: disable=protected-access
+    detector_node._detector.model_info.resolution = 100  # pylint: disable=protected-access
+    monkeypatch.setattr(detector_node, '_decode_to_model_resolution', True)
+    shapes: List[tuple] = []
+
+    def evaluate(image: np.ndarray) -> ImageMetadata:
+        shapes.append(image.shape)
+        return ImageMetadata(box_detections=[
+            BoxDetection(category_name='a', x=10, y=10, width=20, height=20, model_name='m', confidence=1)])
+    monkeypatch.setattr(detector_node._detector.logic, 'evaluate', evaluate)  # pylint: disable=protected-access
+
+    jpg = numpy_array_to_jpg_bytes(np.zeros((600, 800, 3), dtype=np.uint8))
+    metadata = await detector_node.get_detections(jpg, [], autoupload='disabled')
+    await detector_node.inference_scheduler.shutdown()
+
+    assert shapes == [(150, 200, 3)]
+    box = metadata.box_detections[0]
+    assert (box.x, box.y, box.width, box.height) == (40, 40, 80, 80)
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+import requests  # type: ignore
+
+from ...data_classes import (
+    BoxDetection,
+    ClassificationDetection,
+    ImageMetadata,
+    ImagesMetadata,
+    Point,
+    PointDetection,
+    SegmentationDetection,
+    Shape,
+)
+from ...detector import response_encoding
+from ...detector.detector_node import DetectorNode
+from ...detector.exceptions import UnsupportedResponseFormatError
+from ...detector.response_encoding import (
+    COLUMNAR_MEDIA_TYPE,
+    check_response_format,
+    encode_detections,
+    response_format_from_accept,
+)
+from ...globals import GLOBALS
+
+test_image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.jpg')
+
+METADATA = ImageMetadata(
+    box_detections=[BoxDetection(category_name='a', category_id='1', x=1, y=2, width=3, height=4, model_name='m', confidence=0.5),
+                    BoxDetection(category_name='b', category_id='2', x=5, y=6, width=7, height=8, model_name='m', confidence=0.25)],
+    point_detections=[PointDetection(category_name='a', category_id='1', x=1.5, y=2.5, model_name='m', confidence=1)],
+    segmentation_detections=[
+        SegmentationDetection(category_name='c', shape=Shape(points=[Point(x=1, y=2), Point(x=3, y=4)]), model_name='m', confidence=1),
+        SegmentationDetection(category_name='c', shape='5,6', model_name='n', confidence=1)],
+    classification_detections=[ClassificationDetection(category_name='b', category_id='2', model_name='m', confidence=0.75)],
+    tags=['x'])
+
+
+def test_accept_header_negotiation():
+    assert response_format_from_accept(None) == 'json'
+    assert response_format_from_accept('*/*') == 'json'
+    assert response_format_from_accept('application/msgpack, application/json;q=0.5') == 'msgpack'
+    assert response_format_from_accept(f'text/html, {COLUMNAR_MEDIA_TYPE}') == 'columnar'
+
+
+def test_formats_requiring_msgpack_are_rejected_upfront(monkeypatch):
+    monkeypatch.setattr(response_encoding, 'msgpack', None)
+    assert check_response_format('columnar') == 'columnar', 'SocketIO sends columnar results as dicts'
+    for response_format, binary in [('msgpack', False), ('columnar', True)]:
+        with pytest.raises(UnsupportedResponseFormatError):
+            check_response_format(response_format, binary=binary)
+    with pytest.raises(UnsupportedResponseFormatError):
+        check_response_format('xml')
+
+
+def test_columnar_layout():
+    result = encode_detections(METADATA, 'columnar')
+
+    assert result['categories'] == [['a', '1'], ['b', '2'], ['c', None]]
+    assert result['model_names'] == ['m', 'n']
+    boxes = result['box_detections']
+    assert np.frombuffer(boxes['xywh'], '<i4').reshape(-1, 4).tolist() == [[1, 2, 3, 4], [5, 6, 7, 8]]
+    assert np.frombuffer(boxes['confidence'], '<f4').tolist() == [0.5, 0.25]
+    assert np.frombuffer(boxes['category'], '<u2').tolist() == [0, 1]
+    assert np.frombuffer(result['point_detections']['xy'], '<f4').tolist() == [1.5, 2.5]
+    segmentations = result['segmentation_detections']
+    assert np.frombuffer(segmentations['offsets'], '<i4').tolist() == [0, 2, 3]
+    assert np.frombuffer(segmentations['xy'], '<i4').reshape(-1, 2).tolist() == [[1, 2], [3, 4], [5, 6]]
+    assert np.frombuffer(segmentations['model'], '<u2').tolist() == [0, 1]
+    assert np.frombuffer(result['classification_detections']['category'], '<u2').tolist() == [1]
+    assert result['tags'] == ['x']
+
+    batch = encode_detections(ImagesMetadata(items=[METADATA, ImageMetadata()]), 'columnar')
+    assert len(batch['items']) == 2
+    assert batch['items'][1]['box_detections']['xywh'] == b''
+
+
+def test_msgpack_encoding():
+    msgpack = pytest.importorskip('msgpack')
+    assert msgpack.unpackb(encode_detections(METADATA, 'msgpack')) == encode_detections(METADATA, 'json')
+    columnar = msgpack.unpackb(encode_detections(METADATA, 'columnar', binary=True))
+    assert columnar == encode_detections(METADATA, 'columnar')
+
+
+def test_rest_detect_with_accept_header(test_detector_node: DetectorNode):
+    msgpack = pytest.importorskip('msgpack')
+    with open(test_image_path, 'rb') as f:
+        response = requests.post(f'http://localhost:{GLOBALS.detector_port}/detect', files={'file': f},
+                                 headers={'Accept': 'application/msgpack'}, timeout=30)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/msgpack'
+    assert len(msgpack.unpackb(response.content)['box_detections']) == 1
+
+
+async def test_sio_detect_columnar(test_detector_node: DetectorNode, sio_client):
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    image_dict = {'bytes': image.tobytes(), 'shape': image.shape, 'dtype': str(image.dtype)}
+
+    result = await sio_client.call('detect', {'image': image_dict, 'response_format': 'columnar'})
+    assert len(np.frombuffer(result['box_detections']['xywh'], '<i4')) == 4
+
+    result = await sio_client.call('detect', {'image': image_dict, 'response_format': 'xml'})
+    assert 'error' in result
@@ -0,0 +1,63 @@
+import numpy as np
+
+from ...data_classes import ImageMetadata
+from ...detector.detector_node import DetectorNode
+from ...detector.result_cache import ResultCache
+from ...helpers.misc import numpy_array_to_jpg_bytes
+from .testing_detector import write_model
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(2)
+    keys = [cache.key(bytes([i]), '1.0') for i in range(3)]
+    cache.put(keys[0], ImageMetadata(tags=['0']))
+    cache.put(keys[1], ImageMetadata(tags=['1']))
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], ImageMetadata(tags=['2']))
+
+    assert cache.get(keys[1]) is None
+    assert [cache.get(keys[i]).tags for i in (0, 2)] == [['0'], ['2']]  # type: ignore
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_keys_depend_on_content_and_model_version():
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    assert ResultCache.key(image, '1.0') == ResultCache.key(image.copy(), '1.0')
+    assert ResultCache.key(image, '1.0') != ResultCache.key(image, '2.0')
+    assert ResultCache.key(image, '1.0') != ResultCache.key(image.reshape(8, 2, 3), '1.0')
+    assert ResultCache.key(image, '1.0') != ResultCache.key(np.ones((4, 4, 3), dtype=np.uint8), '1.0')
+
+
+async def test_identical_images_are_answered_from_cache(detector_node: DetectorNode):
+    detector_node.result_cache = ResultCache(8)
+    jpg = numpy_array_to_jpg_bytes(np.zeros((10, 10, 3), dtype=np.uint8))
+
+    first = await detector_node.get_detections(jpg, ['a'], autoupload='disabled')
+    second = await detector_node.get_detections(jpg, ['b'], autoupload='disabled')
+    assert (detector_node.result_cache.hits, detector_node.result_cache.misses) == (1, 1)
+    assert second.box_detections == first.box_detections
+    assert second.tags == ['b'], 'the cached result must not be modified by the callers'
+
+    about = detector_node.get_about_response()
+    assert (about.detection_cache_hits, about.detection_cache_misses) == (1, 1)
+
+    await detector_node._build_and_swap_detector(write_model('2.0'))  # pylint: disable=protected-access
+    assert len(detector_node.result_cache) == 0, 'the cache is cleared when the model changes'
+    await detector_node.get_detections(jpg, [], autoupload='disabled')
+    assert detector_node.result_cache.misses == 2
+    await detector_node.inference_scheduler.shutdown()
+
+
+async def test_results_of_a_different_model_are_not_cached(detector_node: DetectorNode, monkeypatch):
+    # pylint: disable=protected-access
+    detector_node.result_cache = ResultCache(8)
+    evaluate_images = detector_node._evaluate_images
+
+    async def evaluate_with_swapped_model(images, slot):
+        return [(metadata, 'swapped') for metadata, _ in await evaluate_images(images, slot)]
+
+    monkeypatch.setattr(detector_node.inference_scheduler, '_evaluate_batch', evaluate_with_swapped_model)
+    jpg = numpy_array_to_jpg_bytes(np.zeros((10, 10, 3), dtype=np.uint8))
+    await detector_node.get_detections(jpg, [], autoupload='disabled')
+    assert len(detector_node.result_cache) == 0, 'the result was not produced by the model of the cache key'
+    await detector_node.inference_scheduler.shutdown()
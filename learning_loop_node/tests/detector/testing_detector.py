@@ -1,4 +1,9 @@
+import json
 import logging
+import os
+import threading
+import time
+from dataclasses import asdict
 from typing import List
 
 import numpy as np
@@ -7,6 +12,7 @@ from learning_loop_node.data_classes import ImagesMetadata, ModelInformation
 
 from ...data_classes import ImageMetadata
 from ...detector.detector_logic import DetectorLogic
+from ...globals import GLOBALS
 from ..test_helper import get_dummy_metadata
 
 
@@ -30,3 +36,38 @@ class TestingDetectorFactory:
 
     async def build(self, model_info: ModelInformation) -> TestingDetectorLogic:
         return TestingDetectorLogic(model_info)
+
+
+class SlowDetectorLogic:
+
+    def __init__(self, model_info: ModelInformation) -> None:
+        self.version = model_info.version
+        self.evaluating_threads: List[str] = []
+
+    def evaluate(self, image: np.ndarray) -> ImageMetadata:
+        self.evaluating_threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return ImageMetadata(tags=[self.version])
+
+    def batch_evaluate(self, images: List[np.ndarray]) -> ImagesMetadata:
+        raise NotImplementedError()
+
+
+class SlowDetectorFactory:
+    model_format = 'mocked'
+
+    def __init__(self) -> None:
+        self.build_count = 0
+
+    async def build(self, model_info: ModelInformation) -> SlowDetectorLogic:
+        self.build_count += 1
+        return SlowDetectorLogic(model_info)
+
+
+def write_model(version: str) -> str:
+    model_info = ModelInformation(id='test', host='', organization='zauberzeug', project='demo', version=version)
+    model_dir = os.path.join(GLOBALS.data_folder, 'models', version)
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, 'model.json'), 'w') as f:
+        json.dump(asdict(model_info), f)
+    return model_dir
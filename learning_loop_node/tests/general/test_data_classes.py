@@ -1,10 +1,28 @@
 from dataclasses import asdict
 
+import pytest
 from dacite import from_dict
 from fastapi.encoders import jsonable_encoder
 
-from ...data_classes import AnnotationData, Category, Context, Point
-from ...enums import AnnotationEventType
+from ...data_classes import (
+    AnnotationData,
+    BoxDetection,
+    Category,
+    ClassificationDetection,
+    Context,
+    DetectorStatus,
+    ImageMetadata,
+    ImagesMetadata,
+    NodeState,
+    Point,
+    PointDetection,
+    SegmentationDetection,
+    Shape,
+    Training,
+    as_jsonable,
+    from_jsonable,
+)
+from ...enums import AnnotationEventType, CategoryType
 
 # Used by all Nodes
 
@@ -20,3 +38,49 @@ def test_basemodel_functionality():
     )
 
     assert from_dict(data_class=AnnotationData, data=jsonable_encoder(asdict(obj))) == obj
+
+
+def test_generated_serializers_match_generic_path():
+    metadata = ImageMetadata(
+        box_detections=[BoxDetection(category_name='a', x=1, y=2, width=3, height=4, model_name='m', confidence=0.5)],
+        point_detections=[PointDetection(category_name='b', x=1.5, y=2.5, model_name='m', confidence=1.0)],
+        segmentation_detections=[
+            SegmentationDetection(category_name='c', shape=Shape(points=[Point(x=1, y=2)]), model_name='m', confidence=1.0),
+            SegmentationDetection(category_name='c', shape='1,2', model_name='m', confidence=1.0)],
+        classification_detections=[ClassificationDetection(category_name='d', model_name='m', confidence=0.3)],
+        tags=['x'], source='test')
+    status = DetectorStatus(uuid='1', name='detector', state=NodeState.Online, uptime=3, model_format='mocked',
+                            current_model='1.0', target_model=None, errors={'e': 'x'}, operation_mode='idle')
+    training = Training(id='1', context=Context(organization='zauberzeug', project='pytest'), project_folder='/p',
+                        images_folder='/p/images', training_folder='/p/trainings/1',
+                        categories=[Category(id='1', name='a', type=CategoryType.Box)], hyperparameters={'lr': 0.1},
+                        training_number=1, training_state='init', model_variant='v')
+
+    for obj in (metadata, ImagesMetadata(items=[metadata]), status, training):
+        assert as_jsonable(obj) == jsonable_encoder(asdict(obj))
+    for obj in (metadata, training):
+        assert from_jsonable(type(obj), as_jsonable(obj)) == from_dict(data_class=type(obj), data=as_jsonable(obj))
+
+
+def test_generated_decoder_validates_types():
+    box = {'category_name': 'a', 'x': 1, 'y': 2, 'width': 3, 'height': 4, 'model_name': 'm', 'confidence': 1}
+    assert from_jsonable(BoxDetection, box).confidence == 1.0, 'JSON does not distinguish ints and floats'
+
+    with pytest.raises(TypeError):
+        from_jsonable(BoxDetection, {**box, 'x': 'left'})
+    with pytest.raises(TypeError):
+        from_jsonable(ImageMetadata, {'box_detections': box})
+    with pytest.raises(TypeError):
+        from_jsonable(BoxDetection, {'category_name': 'a'})
+
+
+def test_generated_decoder_validates_union_members():
+    detection = {'category_name': 'c', 'model_name': 'm', 'confidence': 1.0}
+    assert from_jsonable(SegmentationDetection, {**detection, 'shape': '1,2'}).shape == '1,2'
+    assert from_jsonable(SegmentationDetection, {**detection, 'shape': {'points': [{'x': 1, 'y': 2}]}}).shape == \
+        Shape(points=[Point(x=1, y=2)])
+
+    with pytest.raises(TypeError):
+        from_jsonable(SegmentationDetection, {**detection, 'shape': 123})
+    with pytest.raises(TypeError):
+        from_jsonable(SegmentationDetection, {**detection, 'shape': ['1,2']})
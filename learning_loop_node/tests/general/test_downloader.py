@@ -1,10 +1,18 @@
+import io
 import os
 import shutil
+import zipfile
+from typing import List
 
+import httpx
+import pytest
+
+from ... import data_exchanger as data_exchanger_module
 from ...data_classes import Context
-from ...data_exchanger import DataExchanger
+from ...data_exchanger import DataExchanger, DownloadError
 from ...globals import GLOBALS
 from ...helpers.misc import create_image_folder, create_project_folder, create_training_folder, delete_corrupt_images
+from ...loop_communication import LoopCommunicator
 from .. import test_helper
 
 # Used by all Nodes
@@ -33,6 +41,74 @@ async def test_download_model(data_exchanger: DataExchanger):
     assert '"format": "mocked"' in open(model_json, 'r').read(), 'should have base_model.json'
 
 
+async def test_interrupted_model_download_is_resumed(monkeypatch):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_:
+        zip_.writestr('model.json', '{"version": "1.0"}')
+        zip_.writestr('weights.bin', os.urandom(100_000))
+    content = archive.getvalue()
+    requested_ranges: List[str] = []
+
+    class InterruptedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield content[:50_000]
+            raise httpx.ReadError('connection lost')
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requested_ranges.append(request.headers.get('Range', ''))
+        if len(requested_ranges) == 1:
+            return httpx.Response(200, headers={'Content-Length': str(len(content))}, stream=InterruptedStream())
+        start = int(request.headers['Range'].removeprefix('bytes=').removesuffix('-'))
+        return httpx.Response(206, content=content[start:])
+
+    loop_communicator = LoopCommunicator()
+    monkeypatch.setattr(loop_communicator, 'async_client', httpx.AsyncClient(
+        base_url='http://loop', transport=httpx.MockTransport(handle)))
+    target_folder = os.path.join(GLOBALS.data_folder, 'resumed_model')
+    shutil.rmtree(target_folder, ignore_errors=True)
+
+    files = await DataExchanger(None, loop_communicator).download_model(
+        target_folder, Context(organization='zauberzeug', project='demo'), 'some-uuid', 'mocked')
+
+    assert requested_ranges == ['', 'bytes=50000-']
+    assert sorted(os.listdir(target_folder)) == ['model.json', 'weights.bin']
+    assert sorted(files) == [os.path.join(target_folder, 'model.json'), os.path.join(target_folder, 'weights.bin')]
+    assert not os.listdir(os.path.join(GLOBALS.data_folder, 'downloads')), 'the partial file is removed'
+    shutil.rmtree(target_folder)
+
+
+async def test_failed_model_download_leaves_no_partial_files(monkeypatch):
+    downloads = os.path.join(GLOBALS.data_folder, 'downloads')
+    os.makedirs(downloads, exist_ok=True)
+    stale = os.path.join(downloads, 'old-uuid_mocked.zip.partial')
+    recent = os.path.join(downloads, 'other-uuid_mocked.zip.partial')
+    for partial in (stale, recent):
+        with open(partial, 'wb') as f:
+            f.write(b'partial')
+    os.utime(stale, (0, 0))
+
+    class InterruptedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'some bytes'
+            raise httpx.ReadError('connection lost')
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={'Content-Length': '100'}, stream=InterruptedStream())
+
+    loop_communicator = LoopCommunicator()
+    monkeypatch.setattr(loop_communicator, 'async_client', httpx.AsyncClient(
+        base_url='http://loop', transport=httpx.MockTransport(handle)))
+    monkeypatch.setattr(data_exchanger_module, 'MODEL_DOWNLOAD_ATTEMPTS', 2)
+
+    with pytest.raises(DownloadError):
+        await DataExchanger(None, loop_communicator).download_model(
+            os.path.join(GLOBALS.data_folder, 'failed_model'), Context(organization='zauberzeug', project='demo'),
+            'some-uuid', 'mocked')
+
+    assert os.listdir(downloads) == ['other-uuid_mocked.zip.partial'], 'only the recent partial download is kept'
+    os.remove(recent)
+
+
 # pylint: disable=redefined-outer-name
 async def test_fetching_image_ids(data_exchanger: DataExchanger):
     ids = await data_exchanger.fetch_image_uuids()
@@ -2,14 +2,10 @@
 import json
 import logging
 import os
-from dataclasses import asdict
 from pathlib import Path
 from typing import List
 
-from dacite import from_dict
-from fastapi.encoders import jsonable_encoder
-
-from ..data_classes import Context, Detections, Training
+from ..data_classes import Context, Detections, Training, as_jsonable, from_jsonable
 from ..globals import GLOBALS
 from ..loop_communication import LoopCommunicator
 
@@ -28,11 +24,11 @@ class LastTrainingIO:
 
     def save(self, training: Training) -> None:
         with open(f'{GLOBALS.data_folder}/last_training__{self.node_uuid}.json', 'w') as f:
-            json.dump(asdict(training), f)
+            json.dump(as_jsonable(training), f)
 
     def load(self) -> Training:
         with open(f'{GLOBALS.data_folder}/last_training__{self.node_uuid}.json', 'r') as f:
-            return from_dict(data_class=Training, data=json.load(f))
+            return from_jsonable(Training, json.load(f))
 
     def delete(self) -> None:
         if self.exists():
@@ -88,12 +84,12 @@ class ActiveTrainingIO:
     # TODO: saving and uploading multiple files is not tested!
     def save_detections(self, detections: List[Detections], index: int = 0) -> None:
         with open(self.det_path.format(index), 'w') as f:
-            json.dump(jsonable_encoder([asdict(d) for d in detections]), f)
+            json.dump(as_jsonable(detections), f)
 
     def load_detections(self, index: int = 0) -> List[Detections]:
         with open(self.det_path.format(index), 'r') as f:
             dict_list = json.load(f)
-            return [from_dict(data_class=Detections, data=d) for d in dict_list]
+            return [from_jsonable(Detections, d) for d in dict_list]
 
     def delete_detections(self) -> None:
         for file in self._get_detection_file_names():
@@ -168,7 +164,7 @@ class ActiveTrainingIO:
         if len(batch_detections) == 0:
             logging.debug('skipping empty batch')
             return
-        detections_json = [jsonable_encoder(asdict(detections)) for detections in batch_detections]
+        detections_json = as_jsonable(batch_detections)
         logging.info('uploading %s detections', len(detections_json))
         response = await self.loop_communicator.post(
             f'/{context.organization}/projects/{context.project}/detections', json=detections_json)
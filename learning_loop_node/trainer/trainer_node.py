@@ -1,12 +1,11 @@
 import os
 import sys
 import time
-from dataclasses import asdict
 from typing import Dict, Optional
 
-from fastapi.encoders import jsonable_encoder
 from socketio import AsyncClient, exceptions
 
+from ..data_classes import as_jsonable
 from ..node import Node
 from .io_helpers import LastTrainingIO
 from .rest import backdoor_controls
@@ -93,7 +92,7 @@ class TrainerNode(Node):
         status = self.trainer_logic.generate_status_for_loop(self.uuid, self.name)
         self.log_status_on_change(status.state or 'None', status.short_str())
 
-        result = await self.sio_client.call('update_trainer', jsonable_encoder(asdict(status)), timeout=30)
+        result = await self.sio_client.call('update_trainer', as_jsonable(status), timeout=30)
         if isinstance(result, Dict) and not result['success']:
             self.socket_connection_broken = True
             self.log.error('Error when sending status update: Response from loop was:\n %s', result)